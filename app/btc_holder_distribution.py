@@ -1,92 +1,69 @@
 import requests, os, logging, datetime, time, traceback, tempfile
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
 from app.db import upsert_btc_holder_distribution
+from app.fetcher.coinglass_client import coinglass_get
+from app.job_runner import run_jobs
 
 def fetch_etf_holdings_coinglass():
-    url = "https://open-api-v4.coinglass.com/api/etf/bitcoin/list"
-    headers = {
-        "accept": "application/json",
-        "CG-API-KEY": os.getenv("COINGLASS_API_KEY")
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=20)
-        data = resp.json().get("data", [])
-        total_btc = 0
-        for etf in data:
-            asset_details = etf.get("asset_details", {})
-            # 正確欄位為 holding_quantity
-            holding = float(asset_details.get("holding_quantity", 0))
-            total_btc += holding
-        logging.info(f"[ETF/機構] Coinglass ETF持有BTC總量: {total_btc}")
-        return int(total_btc)
-    except Exception as e:
-        logging.error(f"[ETF/機構] 取得失敗: {e}")
-        return 0
+    path = "/api/etf/bitcoin/list"
+    data = coinglass_get(path, timeout=20).get("data", [])
+    total_btc = 0
+    for etf in data:
+        asset_details = etf.get("asset_details", {})
+        # 正確欄位為 holding_quantity
+        holding = float(asset_details.get("holding_quantity", 0))
+        total_btc += holding
+    logging.info(f"[ETF/機構] Coinglass ETF持有BTC總量: {total_btc}")
+    return int(total_btc)
 
 def fetch_exchange_reserves_coinglass():
-    url = "https://open-api-v4.coinglass.com/api/exchange/balance/list?symbol=BTC"
-    headers = {
-        "accept": "application/json",
-        "CG-API-KEY": os.getenv("COINGLASS_API_KEY")
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=20)
-        data = resp.json().get("data", [])
-        total_btc = sum(float(ex['total_balance']) for ex in data if ex.get('total_balance'))
-        logging.info(f"[交易所儲備] Coinglass API BTC 總量: {total_btc}")
-        return int(total_btc)
-    except Exception as e:
-        logging.error(f"[交易所儲備] Coinglass 取得失敗: {e}")
-        return 0
+    path = "/api/exchange/balance/list"
+    params = {"symbol": "BTC"}
+    data = coinglass_get(path, params=params, timeout=20).get("data", [])
+    total_btc = sum(float(ex['total_balance']) for ex in data if ex.get('total_balance'))
+    logging.info(f"[交易所儲備] Coinglass API BTC 總量: {total_btc}")
+    return int(total_btc)
 
 def fetch_longterm_holder_supply_coinglass():
-    url = "https://open-api-v4.coinglass.com/api/index/bitcoin-long-term-holder-supply"
-    headers = {
-        "accept": "application/json",
-        "CG-API-KEY": os.getenv("COINGLASS_API_KEY")
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=20)
-        result = resp.json()
-        data = result.get("data", [])
-        if not data:
-            logging.error(f"[長期持有者] Coinglass 沒有 data")
-            return 0
-        latest = data[-1]
-        lth_btc = int(latest.get('long_term_holder_supply', 0))
-        logging.info(f"[長期持有者] Coinglass LTH Supply: {lth_btc}")
-        return lth_btc
-    except Exception as e:
-        logging.error(f"[長期持有者] Coinglass 取得失敗: {e}")
-        return 0
+    path = "/api/index/bitcoin-long-term-holder-supply"
+    result = coinglass_get(path, timeout=20)
+    data = result.get("data", [])
+    if not data:
+        logging.error(f"[長期持有者] Coinglass 沒有 data")
+        return None
+    latest = data[-1]
+    lth_btc = int(latest.get('long_term_holder_supply', 0))
+    logging.info(f"[長期持有者] Coinglass LTH Supply: {lth_btc}")
+    return lth_btc
 
 def fetch_unmined_supply_blockchair():
     url = "https://api.blockchair.com/bitcoin/stats"
-    try:
-        resp = requests.get(url, timeout=10)
-        data = resp.json()['data']
-        # circulation 單位是 satoshi（1 BTC = 1e8 sat）
-        circulation_btc = float(data['circulation']) / 1e8
-        unmined = 21000000 - circulation_btc
-        print(f"[DEBUG] 已開採：{circulation_btc:.2f} BTC，未開採：{unmined:.2f} BTC")
-        return int(unmined)
-    except Exception as e:
-        print("[ERROR] 未開採 取得失敗:", e)
-        return 0
+    resp = requests.get(url, timeout=10)
+    resp.raise_for_status()
+    data = resp.json()['data']
+    # circulation 單位是 satoshi（1 BTC = 1e8 sat）
+    circulation_btc = float(data['circulation']) / 1e8
+    unmined = 21000000 - circulation_btc
+    print(f"[DEBUG] 已開採：{circulation_btc:.2f} BTC，未開採：{unmined:.2f} BTC")
+    return int(unmined)
 
 def fetch_btc_holder_distribution():
     result = []
 
-    # 五大類直接抓
-    lth_btc = fetch_longterm_holder_supply_coinglass()
-    exchange_btc = fetch_exchange_reserves_coinglass()
-    etf_btc = fetch_etf_holdings_coinglass()
-    unmined_btc = fetch_unmined_supply_blockchair()
+    # 五大類直接抓（四個來源並行）
+    sources = run_jobs({
+        "lth": fetch_longterm_holder_supply_coinglass,
+        "exchange": fetch_exchange_reserves_coinglass,
+        "etf": fetch_etf_holdings_coinglass,
+        "unmined": fetch_unmined_supply_blockchair,
+    }, max_workers=4, timeout=60, label="btc_holder_sources")
+    # 任一來源失敗/逾時/無資料就不產出：補 0 會讓「其他」（2100萬 - 總和）虛增，寫進圓餅圖
+    missing = {k: r["error"] or "無資料" for k, r in sources.items() if r["result"] is None}
+    if missing:
+        raise RuntimeError(f"持幣分布來源取得失敗，略過本次寫入：{missing}")
+    lth_btc, exchange_btc, etf_btc, unmined_btc = (
+        sources[k]["result"] for k in ["lth", "exchange", "etf", "unmined"]
+    )
     central_btc = 0  # 中央銀行
 
     # 計算其他類
@@ -147,13 +124,8 @@ def fetch_btc_holder_distribution():
     return df[["date", "category", "btc_count", "percent", "source"]]
 
 def fetch_longterm_holder_history():
-    url = "https://open-api-v4.coinglass.com/api/index/bitcoin-long-term-holder-supply"
-    headers = {
-        "accept": "application/json",
-        "CG-API-KEY": os.getenv("COINGLASS_API_KEY")
-    }
-    resp = requests.get(url, headers=headers, timeout=20)
-    result = resp.json()
+    path = "/api/index/bitcoin-long-term-holder-supply"
+    result = coinglass_get(path, timeout=20)
     data = result.get("data", [])
     records = []
     for row in data:
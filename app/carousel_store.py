@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import datetime
+import threading
+from app.utils import cache_path
+
+# 每日 carousel 快照：建好的 Flex JSON、圖片網址、建立時間
+# 有新資料寫入（mark_data_ingested）或超過有效期才重建，推播/管理指令/回覆共用同一份
+CAROUSEL_MAX_AGE = float(os.getenv("CAROUSEL_MAX_AGE_HOURS", "12")) * 3600
+
+_build_lock = threading.Lock()
+
+def _snapshot_file():
+    return cache_path("carousel", "snapshot.json")
+
+def _ingested_file():
+    return cache_path("carousel", "ingested_at")
+
+def mark_data_ingested():
+    """資料寫入後呼叫，讓下一次取用 carousel 時重建"""
+    path = _ingested_file()
+    with open(f"{path}.tmp", "w") as f:
+        f.write(str(time.time()))
+    os.replace(f"{path}.tmp", path)
+
+def last_ingested():
+    try:
+        with open(_ingested_file()) as f:
+            return float(f.read().strip())
+    except (OSError, ValueError):
+        return 0.0
+
+def load_snapshot():
+    path = _snapshot_file()
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN] carousel 快照讀取失敗：{e}")
+        return None
+
+def _is_valid(snapshot, max_age):
+    # 有 bubble 失敗的快照（complete=False）只當次使用，下次取用即重建
+    if not snapshot or not snapshot.get("complete") or not snapshot.get("carousel", {}).get("contents"):
+        return False
+    built_ts = snapshot.get("built_ts", 0)
+    return built_ts >= last_ingested() and time.time() - built_ts < max_age
+
+def _save_snapshot(carousel, complete=True, built_ts=None):
+    # built_ts 應為開始建構的時間：建構期間寫入的新資料（mark_data_ingested）會讓此快照失效
+    built_ts = time.time() if built_ts is None else built_ts
+    snapshot = {
+        "carousel": carousel,
+        "complete": complete,
+        "image_urls": [b.get("hero", {}).get("url") for b in carousel.get("contents", []) if b.get("hero")],
+        "built_ts": built_ts,
+        "built_at": datetime.datetime.fromtimestamp(built_ts).isoformat(timespec="seconds"),
+    }
+    path = _snapshot_file()
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+    return snapshot
+
+def get_daily_carousel(force=False, max_age=None):
+    """
+    取得每日 carousel：快照有效（每組 bubble 都成功、建立後沒有新資料寫入、未超過有效期）就直接回傳，
+    否則重建並存成新快照。同時多個呼叫只會重建一次。
+    """
+    max_age = CAROUSEL_MAX_AGE if max_age is None else max_age
+    snapshot = load_snapshot()
+    if not force and _is_valid(snapshot, max_age):
+        print(f"[LOG] 使用 carousel 快照（建立於 {snapshot['built_at']}）")
+        return snapshot["carousel"]
+    with _build_lock:
+        # 等鎖期間可能已被其他呼叫重建
+        snapshot = load_snapshot()
+        if not force and _is_valid(snapshot, max_age):
+            return snapshot["carousel"]
+        from app.push.flex_utils import build_flex_carousel
+        started = time.time()
+        carousel, complete = build_flex_carousel()
+        if carousel.get("contents"):
+            snapshot = _save_snapshot(carousel, complete, built_ts=started)
+            if complete:
+                print(f"[LOG] carousel 快照已更新（{len(snapshot['image_urls'])} 張圖）")
+            else:
+                print(f"[WARN] carousel 有 bubble 失敗（{len(snapshot['image_urls'])} 張圖），快照標記未完成，下次取用重建")
+        return carousel
@@ -0,0 +1,57 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 共用外部服務客戶端：第一次使用時才建立（import 時不連線、不載入 SDK），全程序共用一份
+_clients = {}
+_lock = threading.Lock()
+
+def _get(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+def set_client(name, client):
+    """以既有物件取代某個客戶端（本機替身、壓測用）；client=None 表示下次重建"""
+    with _lock:
+        if client is None:
+            _clients.pop(name, None)
+        else:
+            _clients[name] = client
+
+def _create_supabase():
+    from supabase import create_client
+    return create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
+def _create_line_bot_api():
+    from linebot import LineBotApi
+    # LINE_API_ENDPOINT 預設為官方 API；壓測時可指向本機替身
+    return LineBotApi(os.getenv('LINE_CHANNEL_ACCESS_TOKEN'),
+                      endpoint=os.getenv('LINE_API_ENDPOINT', 'https://api.line.me'))
+
+def _create_r2():
+    import boto3
+    from botocore.client import Config
+    # boto3 client 為 thread-safe，內建連線池
+    return boto3.client(
+        's3',
+        endpoint_url=os.getenv('CF_R2_ENDPOINT'),
+        aws_access_key_id=os.getenv('CF_R2_ACCESS_KEY'),
+        aws_secret_access_key=os.getenv('CF_R2_SECRET_KEY'),
+        config=Config(signature_version='s3v4', max_pool_connections=16)
+    )
+
+def get_supabase():
+    return _get("supabase", _create_supabase)
+
+def get_line_bot_api():
+    return _get("line_bot_api", _create_line_bot_api)
+
+def get_r2():
+    return _get("r2", _create_r2)
@@ -4,7 +4,11 @@ import pandas as pd
 import time
 import numpy as np
 from dotenv import load_dotenv
-from supabase import create_client
+from app.clients import get_supabase
+from app.etf_flow_stats import update_etf_stats
+from app.carousel_store import mark_data_ingested
+from app.whitelist_cache import invalidate_whitelist
+from app.pipeline.schema import apply_schema
 
 load_dotenv()
 
@@ -17,76 +21,151 @@ IMGBB_API_KEY = os.getenv('IMGBB_API_KEY')
 COINGLASS_API_KEY = os.getenv('COINGLASS_API_KEY')
 TZ = os.getenv('TZ')
 
-# Debug
-print("[DEBUG] SUPABASE_URL:", SUPABASE_URL)
-print("[DEBUG] SUPABASE_KEY:", SUPABASE_KEY[:12], "..." if SUPABASE_KEY else "空值")
-
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # -----------------------------
-# ETF Flows
+# 時序表通用讀取（timeseries_store 同步用）
 # -----------------------------
-def query_etf_flows_all(symbol, table="etf_flows"):
-    limit = 1000
+# 各表同一天內的唯一鍵：offset 分頁必須排序到唯一，否則同日多筆在頁與頁之間可能重複或遺漏
+TABLE_ORDER_KEYS = {
+    "etf_flows": ["asset", "etf_ticker"],
+    "fear_greed_index": [],
+    "funding_rate": ["exchange", "symbol"],
+    "exchange_btc_balance": ["exchange"],
+    "whale_alert": ["symbol", "user_address", "tx_time", "position_action"],
+    "btc_holder_distribution": ["category"],
+    "global_asset_snapshot": ["rank", "symbol"],
+}
+
+def query_table_rows(table, since=None, limit=1000, **eq):
+    """
+    依 date + TABLE_ORDER_KEYS 排序分頁讀取整張表；since: 只取 date >= since（增量同步用），
+    eq: 等值條件（例如 asset="BTC"）
+    """
+    order_keys = ["date"] + TABLE_ORDER_KEYS.get(table, [])
     offset = 0
     all_data = []
     while True:
-        resp = supabase.table(table).select("*").eq("asset", symbol).order("date", desc=False).limit(limit).offset(offset).execute()
+        query = get_supabase().table(table).select("*")
+        for col, value in eq.items():
+            query = query.eq(col, value)
+        if since is not None:
+            query = query.gte("date", pd.Timestamp(since).strftime("%Y-%m-%d"))
+        for col in order_keys:
+            query = query.order(col, desc=False)
+        resp = query.limit(limit).offset(offset).execute()
         data = resp.data
         if not data:
             break
         all_data.extend(data)
         offset += limit
-    df = pd.DataFrame(all_data)
+    return pd.DataFrame(all_data)
+
+# -----------------------------
+# ETF Flows
+# -----------------------------
+def query_etf_flows_all(symbol, table="etf_flows", since=None):
+    """since: 只取 date >= since 的資料（增量同步用）"""
+    df = query_table_rows(table, since=since, asset=symbol)
     if not df.empty:
-        df['date'] = pd.to_datetime(df['date'])
+        df = apply_schema(df, "etf_flows")
     return df
 
+ETF_FLOW_KEYS = ["date", "asset", "etf_ticker"]
+ETF_FLOW_VALUES = ["flow_usd", "price_usd", "total_flow_usd"]
+
+def _query_existing_etf_flows(batch_df, table="etf_flows", limit=1000):
+    """查詢本批次 (asset, 日期區間) 內已存在的資料，用於判斷新增/更新/未變"""
+    existing = []
+    for asset, part in batch_df.groupby("asset"):
+        offset = 0
+        while True:
+            resp = get_supabase().table(table)\
+                .select(",".join(ETF_FLOW_KEYS + ETF_FLOW_VALUES))\
+                .eq("asset", asset)\
+                .gte("date", part["date"].min())\
+                .lte("date", part["date"].max())\
+                .order("date", desc=False)\
+                .order("etf_ticker", desc=False)\
+                .limit(limit).offset(offset).execute()
+            data = resp.data
+            existing.extend(data)
+            if len(data) < limit:
+                break
+            offset += limit
+    df = pd.DataFrame(existing, columns=ETF_FLOW_KEYS + ETF_FLOW_VALUES)
+    for col in ETF_FLOW_VALUES:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df
+
+def _classify_etf_flows(batch_df, existing_df):
+    """回傳 (需寫入的 rows, 新增筆數, 更新筆數, 未變筆數)"""
+    merged = batch_df.merge(existing_df, on=ETF_FLOW_KEYS, how="left",
+                            suffixes=("", "_old"), indicator=True)
+    is_new = merged["_merge"] == "left_only"
+    changed = pd.Series(False, index=merged.index)
+    for col in ETF_FLOW_VALUES:
+        changed |= ~np.isclose(merged[col], merged[f"{col}_old"].fillna(0), rtol=0, atol=1e-6)
+    is_update = ~is_new & changed
+    to_write = batch_df[(is_new | is_update).to_numpy()]
+    return (to_write.to_dict(orient="records"),
+            int(is_new.sum()), int(is_update.sum()), int((~is_new & ~changed).sum()))
+
 def upsert_etf_flows(df, table="etf_flows", batch_size=500, retry_times=3):
-    allow_cols = ["date", "asset", "etf_ticker", "flow_usd", "price_usd", "total_flow_usd"]
-    df = df[allow_cols].dropna(subset=["date", "asset", "etf_ticker"])
+    """
+    以 (date, asset, etf_ticker) 為唯一鍵批次 upsert，每批只需一次查詢＋一次寫入。
+    未變動的資料不會重送；回傳 {"inserted", "updated", "unchanged", "batches": [...]} 統計。
+    """
+    allow_cols = ETF_FLOW_KEYS + ETF_FLOW_VALUES
+    df = df[allow_cols].dropna(subset=ETF_FLOW_KEYS).copy()
     df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
     for col in ["asset", "etf_ticker"]:
         df[col] = df[col].astype(str).fillna("")
-    for col in ["flow_usd", "price_usd", "total_flow_usd"]:
+    for col in ETF_FLOW_VALUES:
         df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
-    df = df.drop_duplicates(subset=["date", "asset", "etf_ticker"], keep="last")
-    rows = df.to_dict(orient="records")
-    total = len(rows)
+    df = df.drop_duplicates(subset=ETF_FLOW_KEYS, keep="last")
+    # 依資產、日期排序，讓每批的日期區間盡量緊湊
+    df = df.sort_values(["asset", "date", "etf_ticker"]).reset_index(drop=True)
+    total = len(df)
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "batches": []}
+    written = []
 
     for i in range(0, total, batch_size):
-        batch = rows[i:i+batch_size]
-
-        # 逐筆刪除再插入，確保唯一鍵不衝突
-        for row in batch:
-            for attempt in range(retry_times):
-                try:
-                    supabase.table(table)\
-                        .delete()\
-                        .eq("date", row["date"])\
-                        .eq("asset", row["asset"])\
-                        .eq("etf_ticker", row["etf_ticker"])\
-                        .execute()
-                    break
-                except Exception as e:
-                    print(f"Delete error ({row['date']} {row['asset']} {row['etf_ticker']}) (try {attempt+1}): {e}")
-                    if attempt < retry_times - 1:
-                        time.sleep(2)
-                    else:
-                        print("Skip delete.")
-
-        # 批次插入
+        batch_df = df.iloc[i:i+batch_size]
+        started = time.perf_counter()
         for attempt in range(retry_times):
             try:
-                supabase.table(table).insert(batch).execute()
-                print(f"Batch insert [{i} ~ {i+len(batch)-1}] OK")
+                existing_df = _query_existing_etf_flows(batch_df, table=table)
+                rows, n_new, n_upd, n_same = _classify_etf_flows(batch_df, existing_df)
+                if rows:
+                    get_supabase().table(table)\
+                        .upsert(rows, on_conflict=",".join(ETF_FLOW_KEYS), returning="minimal")\
+                        .execute()
+                elapsed = time.perf_counter() - started
+                stats["inserted"] += n_new
+                stats["updated"] += n_upd
+                stats["unchanged"] += n_same
+                stats["batches"].append({"start": i, "end": i+len(batch_df)-1, "seconds": round(elapsed, 3)})
+                written.append(batch_df)
+                print(f"Batch upsert [{i} ~ {i+len(batch_df)-1}] OK "
+                      f"新增 {n_new} / 更新 {n_upd} / 未變 {n_same}（{elapsed:.2f}s）")
                 break
             except Exception as e:
-                print(f"Batch insert error [{i} ~ {i+len(batch)-1}] (try {attempt+1}): {e}")
+                print(f"Batch upsert error [{i} ~ {i+len(batch_df)-1}] (try {attempt+1}): {e}")
                 if attempt < retry_times - 1:
                     time.sleep(2)
                 else:
-                    print("Skip insert batch.")
+                    print("Skip upsert batch.")
+
+    print(f"✅ {table} upsert 完成：新增 {stats['inserted']} / 更新 {stats['updated']} / 未變 {stats['unchanged']}")
+    if stats["inserted"] or stats["updated"]:
+        mark_data_ingested()
+    # 增量更新歷史彙總（最大流入/流出、中位數、平均）
+    if written:
+        try:
+            update_etf_stats(pd.concat(written), table=table)
+        except Exception as e:
+            print(f"[WARN] ETF 彙總更新失敗：{e}")
+    return stats
 
 # -----------------------------
 # Global Asset Snapshot
@@ -99,7 +178,8 @@ def upsert_global_asset_snapshot(df, table="global_asset_snapshot", batch_size=2
     total = len(rows)
     for i in range(0, total, batch_size):
         batch = rows[i:i+batch_size]
-        supabase.table(table).upsert(batch).execute()
+        get_supabase().table(table).upsert(batch).execute()
+    mark_data_ingested()
     print(f"✅ 已 upsert {total} 筆資產市值快照進 {table}")
 
 # -----------------------------
@@ -111,22 +191,10 @@ def upsert_btc_holder_distribution(df, table="btc_holder_distribution", batch_si
     total = len(rows)
     for i in range(0, total, batch_size):
         batch = rows[i:i+batch_size]
-        supabase.table(table).upsert(batch).execute()
+        get_supabase().table(table).upsert(batch).execute()
+    mark_data_ingested()
     print(f"✅ 已 upsert {total} 筆持幣分布進 {table}")
 
-def query_btc_holder_distribution(days=14, table="btc_holder_distribution"):
-    end = datetime.date.today()
-    start = end - datetime.timedelta(days=days-1)
-    resp = supabase.table(table)\
-        .select("*")\
-        .gte("date", start.strftime("%Y-%m-%d"))\
-        .order("date", desc=False)\
-        .execute()
-    df = pd.DataFrame(resp.data)
-    if not df.empty:
-        df['date'] = pd.to_datetime(df['date'])
-    return df
-
 # -----------------------------
 # Bot Whitelist (新增)
 # -----------------------------
@@ -147,20 +215,37 @@ def upsert_bot_whitelist(user_id, provider="line", plan_code="pro",
         "access_until": access_until,
         "status": status,
     }
-    supabase.table("bot_whitelist").upsert(row).execute()
+    get_supabase().table("bot_whitelist").upsert(row).execute()
+    invalidate_whitelist()
     print(f"✅ 已 upsert whitelist user {user_id}")
 
 def remove_bot_whitelist(user_id, reason="manual_remove"):
-    supabase.table("bot_whitelist")\
+    get_supabase().table("bot_whitelist")\
         .update({"status": "removed", "removed_reason": reason})\
         .eq("user_id", user_id).execute()
+    invalidate_whitelist()
     print(f"🚫 已移除 whitelist user {user_id}, reason={reason}")
 
+def insert_push_deliveries(rows, table="push_deliveries", batch_size=500):
+    """寫入每位推播對象的送達結果（push_id, label, user_id, status, mode, attempts, error, created_at）"""
+    for i in range(0, len(rows), batch_size):
+        get_supabase().table(table).insert(rows[i:i+batch_size], returning="minimal").execute()
+
 def query_active_whitelist():
     now = datetime.datetime.utcnow().isoformat()
-    resp = supabase.table("bot_whitelist")\
+    resp = get_supabase().table("bot_whitelist")\
         .select("user_id")\
         .eq("status", "active")\
         .gte("access_until", now)\
         .execute()
     return [r["user_id"] for r in resp.data]
+
+def query_active_whitelist_entries():
+    """有效白名單 {user_id: access_until(ISO 字串)}，供 whitelist_cache 載入"""
+    now = datetime.datetime.utcnow().isoformat()
+    resp = get_supabase().table("bot_whitelist")\
+        .select("user_id, access_until")\
+        .eq("status", "active")\
+        .gte("access_until", now)\
+        .execute()
+    return {r["user_id"]: r["access_until"] for r in resp.data}
@@ -0,0 +1,132 @@
+import os
+import json
+import threading
+import pandas as pd
+from sortedcontainers import SortedList
+from app.utils import cache_path
+
+# 每個資產兩份檔案：
+#   *_days.json  逐日 total_flow_usd 與依值排序的清單（增量更新用的結構）
+#   *_stats.json 摘要值（最大流入/流出與日期、筆數、總和、平均、非零中位數）
+# upsert_etf_flows 寫入新資料時增量更新（尚無基準的資產在寫入端以資料庫全歷史建立）；
+# 推播端只讀摘要，不掃描、不重建全歷史
+_lock = threading.Lock()
+
+def _stats_file(asset, kind, table="etf_flows"):
+    return cache_path("etf_flows", f"{table}_{asset}_{kind}.json")
+
+def _read_json(path, default):
+    if not os.path.isfile(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_json(path, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+def _load(asset, table="etf_flows"):
+    state = _read_json(_stats_file(asset, "days", table), {})
+    summary = _read_json(_stats_file(asset, "stats", table), {"count": 0, "sum": 0.0})
+    ordered = SortedList((float(v), d) for v, d in state.get("sorted", []))
+    return state.get("days", {}), ordered, summary
+
+def _save(asset, days, ordered, summary, table="etf_flows"):
+    _write_json(_stats_file(asset, "days", table), {"days": days, "sorted": [[v, d] for v, d in ordered]})
+    _write_json(_stats_file(asset, "stats", table), summary)
+
+def _nonzero_median(ordered):
+    """ordered 依值排序，0 值集中在一段；跳過該段取中位數，O(log n)"""
+    lo = ordered.bisect_left((0.0, ""))
+    hi = ordered.bisect_right((0.0, "\uffff"))
+    n = len(ordered) - (hi - lo)
+    if n == 0:
+        return None
+
+    def kth(k):
+        return ordered[k if k < lo else k + (hi - lo)][0]
+    if n % 2:
+        return kth(n // 2)
+    return (kth(n // 2 - 1) + kth(n // 2)) / 2
+
+def _summarize(days, ordered, summary):
+    count, total = summary["count"], summary["sum"]
+    summary.update({
+        "mean": total / count if count else None,
+        "nonzero_median": _nonzero_median(ordered),
+        "max_in": list(ordered[-1]) if ordered else [None, ""],
+        "max_out": list(ordered[0]) if ordered else [None, ""],
+        "first_date": min(days) if days else None,
+        "last_date": max(days) if days else None,
+    })
+    return summary
+
+def _daily_totals(df):
+    """(asset, date) → 當日 total_flow_usd（同 plot 邏輯取每日第一筆）"""
+    daily = df.dropna(subset=["total_flow_usd"]).copy()
+    daily["date"] = pd.to_datetime(daily["date"]).dt.strftime("%Y-%m-%d")
+    return daily.groupby(["asset", "date"], observed=True)["total_flow_usd"].first().astype(float)
+
+def update_etf_stats(df, table="etf_flows"):
+    """
+    以新寫入的 ETF flow 增量更新各資產彙總（新日期加入、既有日期以新值取代）。
+    尚未建立基準的資產（例如新容器沒有本地彙總檔）改以資料庫全歷史建立，已含本次寫入。
+    """
+    daily = _daily_totals(df)
+    missing = []
+    with _lock:
+        for asset, part in daily.groupby(level="asset"):
+            days, ordered, summary = _load(asset, table)
+            if not days:
+                missing.append(asset)
+                continue
+            for (_, date), value in part.items():
+                old = days.get(date)
+                if old is None:
+                    summary["count"] += 1
+                    summary["sum"] += value
+                else:
+                    ordered.discard((float(old), date))
+                    summary["sum"] += value - old
+                days[date] = value
+                ordered.add((value, date))
+            _save(asset, days, ordered, _summarize(days, ordered, summary), table)
+    for asset in missing:
+        seed_etf_stats(asset, table)
+
+def rebuild_etf_stats(asset, df_history, table="etf_flows"):
+    """以完整歷史重建某資產彙總（首次使用或與資料庫不同步時）"""
+    daily = _daily_totals(df_history.assign(asset=asset))
+    days = {date: value for (_, date), value in daily.items()}
+    ordered = SortedList((v, d) for d, v in days.items())
+    summary = _summarize(days, ordered, {"count": len(days), "sum": float(sum(days.values()))})
+    with _lock:
+        _save(asset, days, ordered, summary, table)
+    print(f"[LOG] {asset} ETF 彙總已重建：{len(days)} 日")
+    return summary
+
+def seed_etf_stats(asset, table="etf_flows"):
+    """向資料庫讀取某資產全歷史並重建彙總（寫入端 / 管理指令使用）"""
+    from app.db import query_etf_flows_all
+
+    df_history = query_etf_flows_all(asset, table=table)
+    if df_history.empty:
+        print(f"[WARN] {asset} 無 ETF 歷史資料，略過彙總建立")
+        return None
+    return rebuild_etf_stats(asset, df_history, table)
+
+def get_etf_stats(asset, target_date=None, table="etf_flows"):
+    """
+    讀取某資產的歷史彙總（O(1)，只讀檔案）。尚無彙總回傳 None；
+    最後日期與 target_date 不一致時照常回傳並提示，由下次寫入（或 seed_etf_stats）補齊。
+    """
+    with _lock:
+        summary = _read_json(_stats_file(asset, "stats", table), {})
+    if not summary.get("last_date"):
+        print(f"[WARN] {asset} ETF 彙總尚未建立，待下次寫入時建立")
+        return None
+    if target_date is not None and summary["last_date"] != pd.Timestamp(target_date).strftime("%Y-%m-%d"):
+        print(f"[WARN] {asset} ETF 彙總最後日期 {summary['last_date']} 與 {pd.Timestamp(target_date).date()} 不一致")
+    return summary
@@ -1,23 +1,119 @@
+import os
+import json
 import requests
-from bs4 import BeautifulSoup
+from app.utils import cache_path
 
-def fetch_global_asset_top10():
-    url = "https://companiesmarketcap.com/assets-by-market-cap/"
-    resp = requests.get(url)
-    soup = BeautifulSoup(resp.text, "html.parser")
+URL = "https://companiesmarketcap.com/assets-by-market-cap/"
+TOP_N = 10
+CHUNK_SIZE = 16 * 1024
+# 解析提早結束後，剩餘 body 在此大小內就讀完，讓連線回到 Session 連線池重用（keep-alive）；
+# 超過則直接關閉，該次連線不重用
+DRAIN_MAX_BYTES = int(os.getenv("ASSET_RANKING_DRAIN_MAX", str(1024 * 1024)))
+
+# keep-alive 連線（需讀完 body 才能重用，見 _drain）；頁面以 gzip 傳輸
+_http = requests.Session()
+_http.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+def _cell_text(td):
+    return "".join(td.itertext()).strip()
+
+def parse_asset_top10(chunks, limit=TOP_N, encoding=None):
+    """
+    以 lxml 增量解析：HTML 逐段餵入，讀滿第一個表格 tbody 的前 limit 列即停止，
+    不解析（也不必下載）整份文件。chunks 為 bytes 的 iterable（或整份 bytes）；
+    encoding=None 時由 lxml 依 <meta charset> 判斷。
+    """
+    from lxml import etree
+
+    if isinstance(chunks, (bytes, str)):
+        chunks = [chunks]
+    parser = etree.HTMLPullParser(events=("end",), tag="tr", encoding=encoding)
     result = []
-    for item in soup.select("table tbody tr")[:10]:  # 只抓前10
-        cols = item.find_all("td")
-        rank = int(cols[0].text.strip())
-        name = cols[1].text.strip()
-        symbol = cols[2].text.strip()
-        market_cap = cols[3].text.strip()
-        logo_url = cols[1].find("img")['src'] if cols[1].find("img") else None
-        result.append({
-            "rank": rank,
-            "name": name,
-            "symbol": symbol,
-            "market_cap": market_cap,
-            "logo": logo_url,
+
+    def collect():
+        for _, tr in parser.read_events():
+            parent = tr.getparent()
+            if parent is None or parent.tag != "tbody":
+                continue
+            cols = tr.findall("td")
+            if len(cols) < 4:
+                continue
+            img = cols[1].find(".//img")
+            result.append({
+                "rank": int(_cell_text(cols[0])),
+                "name": _cell_text(cols[1]),
+                "symbol": _cell_text(cols[2]),
+                "market_cap": _cell_text(cols[3]),
+                "logo": img.get("src") if img is not None else None,
+            })
+            if len(result) >= limit:
+                return True
+        return False
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        if collect():
+            return result
+    parser.close()
+    collect()
+    return result[:limit]
+
+def _cache_file():
+    return cache_path("asset_ranking", "top10.json")
+
+def _load_cached():
+    path = _cache_file()
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_cached(entry):
+    path = _cache_file()
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+def _declared_encoding(resp):
+    """回應標頭有宣告 charset 才回傳（requests 對沒宣告的 text/* 會預設 ISO-8859-1，交給 lxml 判斷）"""
+    if "charset=" in resp.headers.get("Content-Type", "").lower():
+        return resp.encoding
+    return None
+
+def _drain(chunks, limit=None):
+    """讀完剩餘的 body（最多 limit bytes，預設 DRAIN_MAX_BYTES），回傳是否讀完"""
+    limit = DRAIN_MAX_BYTES if limit is None else limit
+    read = 0
+    for chunk in chunks:
+        read += len(chunk)
+        if read > limit:
+            return False
+    return True
+
+def fetch_global_asset_top10():
+    # 條件式 GET：帶上次的 ETag / Last-Modified，頁面未變更（304）就沿用上次解析結果
+    cached = _load_cached()
+    headers = {}
+    if cached.get("rows"):
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    with _http.get(URL, headers=headers, stream=True, timeout=20) as resp:
+        if resp.status_code == 304:
+            print("[LOG] 資產排行頁面未變更（304），沿用上次結果")
+            return cached["rows"]
+        resp.raise_for_status()
+        chunks = resp.iter_content(CHUNK_SIZE)
+        result = parse_asset_top10(chunks, encoding=_declared_encoding(resp))
+        if not _drain(chunks):
+            print(f"[DEBUG] 資產排行頁面剩餘內容超過 {DRAIN_MAX_BYTES} bytes，關閉連線不重用")
+
+    if result:
+        _save_cached({
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "rows": result,
         })
-    return result
\ No newline at end of file
+    return result
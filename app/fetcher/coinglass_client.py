@@ -0,0 +1,135 @@
+import os
+import copy
+import time
+import threading
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from app.rate_limiter import TokenBucket
+
+load_dotenv()
+
+BASE_URL = "https://open-api-v4.coinglass.com"
+# API 方案額度（每分鐘請求數），Hobbyist=30、Startup=80、Standard=300、Professional=1200
+COINGLASS_RATE_LIMIT = float(os.getenv("COINGLASS_RATE_LIMIT", "30"))
+COINGLASS_MAX_RETRIES = int(os.getenv("COINGLASS_MAX_RETRIES", "4"))
+COINGLASS_CACHE_TTL = float(os.getenv("COINGLASS_CACHE_TTL", "600"))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class CoinglassError(RuntimeError):
+    pass
+
+_session = None
+_session_lock = threading.Lock()
+# 每分鐘額度換算成每秒速率，突發量最多 5 筆，避免同時湧入觸發 429
+_limiter = TokenBucket(COINGLASS_RATE_LIMIT / 60.0, capacity=min(5, COINGLASS_RATE_LIMIT))
+
+def get_session():
+    """共用 keep-alive 連線池（全程序一個 Session，重複使用 TLS 連線）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "accept": "application/json",
+                "Accept-Encoding": "gzip, deflate",
+            })
+            _session = session
+        return _session
+
+# 請求範圍快取：只在 response_cache() 區塊內生效，key = (path, params)
+_cache_lock = threading.Lock()
+_cache_scope = None
+_cache_ttl = COINGLASS_CACHE_TTL
+
+@contextmanager
+def response_cache(ttl=None):
+    """
+    在 with 區塊內（例如一次 fetch_all_data），相同 endpoint + params 只打一次 API，
+    其他 fetcher 直接拿到同一份 payload；同時請求同一資源會等待第一個請求的結果。
+    巢狀使用時沿用外層快取。
+    """
+    global _cache_scope, _cache_ttl
+    with _cache_lock:
+        outer = _cache_scope is not None
+        if not outer:
+            _cache_scope = {}
+            _cache_ttl = COINGLASS_CACHE_TTL if ttl is None else ttl
+    try:
+        yield
+    finally:
+        if not outer:
+            with _cache_lock:
+                hits = sum(e["hits"] for e in _cache_scope.values())
+                print(f"[LOG] Coinglass 快取：{len(_cache_scope)} 個資源，命中 {hits} 次")
+                _cache_scope = None
+
+def _cache_key(path, params):
+    return path, tuple(sorted((params or {}).items()))
+
+def _retry_delay(resp, attempt):
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(30.0, 2 ** attempt)
+
+def coinglass_get(path, params=None, timeout=20):
+    """
+    呼叫 Coinglass v4 API（GET），回傳完整 json。
+    每次嘗試都會經過限流器；429/5xx 與連線錯誤以指數退避重試，重試用盡則丟出例外，不再默默回傳空資料。
+    在 response_cache() 區塊內，相同 path + params 在 TTL 內直接回傳已抓取的結果。
+    """
+    with _cache_lock:
+        scope, ttl = _cache_scope, _cache_ttl
+        entry = None
+        if scope is not None:
+            entry = scope.setdefault(_cache_key(path, params),
+                                     {"lock": threading.Lock(), "payload": None, "expires": 0.0, "hits": 0})
+    if entry is None:
+        return _fetch(path, params, timeout)
+    with entry["lock"]:
+        if entry["payload"] is not None and time.monotonic() < entry["expires"]:
+            entry["hits"] += 1
+            print(f"[LOG] Coinglass 快取命中：{path} {params or ''}")
+        else:
+            entry["payload"] = _fetch(path, params, timeout)
+            entry["expires"] = time.monotonic() + ttl
+        return copy.deepcopy(entry["payload"])
+
+def _fetch(path, params, timeout):
+    api_key = os.getenv("COINGLASS_API_KEY")
+    if not api_key:
+        raise RuntimeError("⚠️  Missing COINGLASS_API_KEY in environment variables")
+    url = path if path.startswith("http") else f"{BASE_URL}{path}"
+    session = get_session()
+
+    for attempt in range(COINGLASS_MAX_RETRIES + 1):
+        _limiter.acquire()
+        resp = None
+        try:
+            resp = session.get(url, params=params, headers={"CG-API-KEY": api_key}, timeout=timeout)
+            if resp.status_code not in RETRY_STATUS:
+                break
+            reason = f"HTTP {resp.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            reason = repr(e)
+        if attempt == COINGLASS_MAX_RETRIES:
+            if resp is None:
+                raise CoinglassError(f"[Coinglass] {path} 重試 {attempt} 次仍失敗：{reason}")
+            break
+        delay = _retry_delay(resp, attempt)
+        print(f"[WARN] Coinglass {path} {reason}，{delay:.1f}s 後重試 ({attempt+1}/{COINGLASS_MAX_RETRIES})")
+        time.sleep(delay)
+
+    resp.raise_for_status()
+    payload = resp.json()
+    code = str(payload.get("code", "0"))
+    if code != "0":
+        raise CoinglassError(f"[Coinglass] {path} code={code} msg={payload.get('msg')}")
+    return payload
@@ -2,6 +2,7 @@ import datetime
 from app.fetcher.asset_ranking import fetch_global_asset_top10
 from app.pipeline.asset_ranking_df import asset_top10_to_df
 from app.db import upsert_global_asset_snapshot
+from app import timeseries_store
 
 def daily_asset_snapshot():
     today = datetime.date.today().strftime('%Y-%m-%d')
@@ -11,5 +12,17 @@ def daily_asset_snapshot():
     print("今日資產市值快照已寫入 Supabase！")
     print(df)
 
+def get_asset_top10_df(date):
+    """
+    推播用的市值 Top10：優先讀 13:50 已寫入的當日快照，
+    當日快照不存在時才即時爬取（不寫入，避免推播途中觸發 carousel 重建）
+    """
+    df = timeseries_store.get_range("global_asset_snapshot", start=date, end=date)
+    if not df.empty:
+        print(f"[LOG] 使用已存的資產市值快照：{date}（{len(df)} 筆）")
+        return df.sort_values("rank").reset_index(drop=True)
+    print(f"[WARN] {date} 資產市值快照不存在，改為即時爬取")
+    return asset_top10_to_df(fetch_global_asset_top10(), date)
+
 if __name__ == "__main__":
     daily_asset_snapshot()
@@ -3,6 +3,7 @@ import os
 from app.fetcher.coinglass_etf import fetch_etf_flow
 from app.pipeline.processor import process_etf_flows_json
 from app.db import upsert_etf_flows
+from app import timeseries_store
 
 load_dotenv()
 
@@ -13,6 +14,8 @@ def fetch_and_save_history(symbol="BTC", days=2000):
         return
     df = process_etf_flows_json(json_data, symbol)
     upsert_etf_flows(df)
+    # 全歷史回補可能改動重疊區間以外的舊資料，清掉本地時序資料讓下次全量重載
+    timeseries_store.invalidate("etf_flows")
     print(f"✅ {symbol} 歷史 {len(df)} 筆資料 upsert 完成")
 
 if __name__ == "__main__":
@@ -1,19 +1,13 @@
-import requests
-import os
 import pandas as pd
-from supabase import create_client
+from app.clients import get_supabase
 from dotenv import load_dotenv
+from app.fetcher.coinglass_client import coinglass_get
 
 load_dotenv()
-COINGLASS_API_KEY = os.getenv('COINGLASS_API_KEY')
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
 CHUNK_SIZE = 1000
 
 def fetch_and_save_exchange_balance(days=1):
-    url = 'https://open-api-v4.coinglass.com/api/exchange/balance/list?symbol=BTC'
-    headers = {"accept": "application/json", "CG-API-KEY": COINGLASS_API_KEY}
-    r = requests.get(url, headers=headers, timeout=10)
-    result = r.json()
+    result = coinglass_get('/api/exchange/balance/list', params={"symbol": "BTC"}, timeout=10)
     data = result.get('data', [])
     today = pd.Timestamp.today().strftime('%Y-%m-%d')
     records = []
@@ -27,7 +21,7 @@ def fetch_and_save_exchange_balance(days=1):
     for i in range(0, len(records), CHUNK_SIZE):
         chunk = records[i:i+CHUNK_SIZE]
         print(f"[LOG] Upserting chunk {i//CHUNK_SIZE+1} ({len(chunk)} records)")
-        resp = supabase.table("exchange_btc_balance").upsert(chunk).execute()
+        resp = get_supabase().table("exchange_btc_balance").upsert(chunk).execute()
         print("[LOG] Upsert chunk response:", resp)
     print(f"✅ 交易所 BTC 餘額共 {len(records)} 筆已寫入 Supabase！")
 
@@ -1,20 +1,14 @@
-import requests
-import os
-import pandas as pd
-from supabase import create_client
+from app.clients import get_supabase
 from dotenv import load_dotenv
+from app.fetcher.coinglass_client import coinglass_get
+from app.pipeline.processor import fear_greed_to_df
 
 load_dotenv()
-COINGLASS_API_KEY = os.getenv('COINGLASS_API_KEY')
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
 
 CHUNK_SIZE = 1000
 
 def fetch_and_save_fear_greed(days=2000):
-    url = 'https://open-api-v4.coinglass.com/api/index/fear-greed-history'
-    headers = {"accept": "application/json", "CG-API-KEY": COINGLASS_API_KEY}
-    r = requests.get(url, headers=headers, timeout=10)
-    result = r.json()
+    result = coinglass_get('/api/index/fear-greed-history', timeout=10)
     
     # 這裡要正確取得 data 內容
     data = result.get('data', {})
@@ -29,21 +23,15 @@ def fetch_and_save_fear_greed(days=2000):
         data_list = data_list[-days:]
         time_list = time_list[-days:]
     
-    records = []
-    for score, ts in zip(data_list, time_list):
-        date = pd.to_datetime(ts, unit="ms").strftime('%Y-%m-%d')
-        records.append({
-            "date": date,
-            "score": int(score),  # 關鍵：轉成 int
-            # "level": None,
-        })
+    # score 轉成 int（關鍵）
+    records = fear_greed_to_df(data_list, time_list).to_dict('records')
 
     print(f"[LOG] Prepared records: {len(records)}")
     # 分批 upsert
     for i in range(0, len(records), CHUNK_SIZE):
         chunk = records[i:i+CHUNK_SIZE]
         print("[DEBUG] 即將上傳的 chunk：", chunk[:3])
-        resp = supabase.table("fear_greed_index").upsert(chunk, on_conflict="date").execute()
+        resp = get_supabase().table("fear_greed_index").upsert(chunk, on_conflict="date").execute()
         print("[LOG] Upsert chunk response:", resp)
     print(f"✅ 恐懼貪婪指數共 {len(records)} 筆已寫入 Supabase！")
 
@@ -1,21 +1,24 @@
 from __future__ import annotations
-import hmac, json, os
+import hmac, json, os, threading, time
+from collections import OrderedDict
 from hashlib import sha256
 from typing import Optional, Any, Dict
 from datetime import datetime
 
 from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, constr
 
 # 專案既有：Supabase 客戶端
-from app.db import supabase  # type: ignore
+from app.clients import get_supabase
+from app.whitelist_cache import invalidate_whitelist
 
 router = APIRouter(prefix="/internal/whitelist", tags=["internal-whitelist"]) 
 BOT_SECRET = os.getenv("BOT_SECRET", "")
 
 # ---------- Pydantic Models ----------
 class UpsertBody(BaseModel):
-    provider: constr(strip_whitespace=True, to_lower=True) = Field(..., regex=r"^[a-z0-9_\-]+$")
+    provider: constr(strip_whitespace=True, to_lower=True) = Field(..., pattern=r"^[a-z0-9_\-]+$")
     user_id: constr(strip_whitespace=True, min_length=5, max_length=128)
     plan_code: constr(strip_whitespace=True, to_lower=True, min_length=2, max_length=64)  # e.g. pro_month, pro_year, elite_month, elite_year
     order_no: Optional[str] = None
@@ -45,44 +48,131 @@ async def _require_sig_and_key(request: Request, signature: Optional[str], idem_
         raise HTTPException(status_code=400, detail="missing X-Idempotency-Key")
     return idem_key, raw
 
-# 簡單的型錄快取（記憶體級，進程重啟後重載）
-_PLAN_CACHE: dict[str, dict] = {}
+# 方案型錄快取：啟動時整批預載 is_active 的方案，之後 /upsert 直接讀記憶體
+# - 超過 PLAN_CACHE_TTL 秒整批重載一次（後台改了 subscription_plans 不必重啟）
+# - 最多 PLAN_CACHE_MAX 筆（LRU），未知 plan_code 不會無限制撐大快取
+# - POST /refresh_plans 可立即重載
+# - TTL 到期時只有一個請求重載（_plan_reload_lock），其餘等它完成後直接讀新型錄；
+#   重載失敗沿用舊型錄，PLAN_RELOAD_RETRY 秒後才再試
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "600"))
+PLAN_CACHE_MAX = int(os.getenv("PLAN_CACHE_MAX", "256"))
+PLAN_RELOAD_RETRY = float(os.getenv("PLAN_RELOAD_RETRY", "30"))
+
+_PLAN_CACHE: "OrderedDict[str, dict]" = OrderedDict()
+_plan_lock = threading.Lock()
+_plan_reload_lock = threading.Lock()
+_plans_loaded_at = 0.0
+
+def _cache_plan(plan: dict) -> None:
+    _PLAN_CACHE[plan["plan_code"]] = plan
+    _PLAN_CACHE.move_to_end(plan["plan_code"])
+    while len(_PLAN_CACHE) > PLAN_CACHE_MAX:
+        _PLAN_CACHE.popitem(last=False)
+
+def preload_plans() -> int:
+    """整批載入所有 is_active 方案（啟動時與 TTL 到期時），回傳筆數"""
+    global _plans_loaded_at
+    resp = get_supabase().table("subscription_plans").select("*").eq("is_active", True).execute()
+    rows = resp.data or []
+    with _plan_lock:
+        _PLAN_CACHE.clear()
+        for row in rows:
+            _cache_plan(row)
+        _plans_loaded_at = time.time()
+    print(f"[LOG] 方案型錄已載入：{len(rows)} 筆")
+    return len(rows)
+
+def _preload_plans_on_startup() -> None:
+    # include_router 後 app 與 router 的 startup 都會觸發，已載入就略過
+    if time.time() - _plans_loaded_at < PLAN_CACHE_TTL:
+        return
+    try:
+        preload_plans()
+    except Exception as e:
+        # 預載失敗不擋啟動，第一次 /upsert 時再載
+        print(f"[WARN] 方案型錄預載失敗: {e}")
+
+router.add_event_handler("startup", _preload_plans_on_startup)
+
+def _plans_stale() -> bool:
+    return time.time() - _plans_loaded_at > PLAN_CACHE_TTL
+
+def _reload_plans_if_stale() -> None:
+    global _plans_loaded_at
+    if not _plans_stale():
+        return
+    with _plan_reload_lock:
+        # 等鎖期間可能已被其他請求重載
+        if not _plans_stale():
+            return
+        try:
+            preload_plans()
+        except Exception as e:
+            # 重載失敗時沿用手上的型錄，PLAN_RELOAD_RETRY 秒後再試（避免每個請求都重打資料庫）
+            print(f"[WARN] 方案型錄重載失敗，沿用快取: {e}")
+            with _plan_lock:
+                _plans_loaded_at = time.time() - PLAN_CACHE_TTL + PLAN_RELOAD_RETRY
 
 def _load_plan(plan_code: str) -> dict:
-    global _PLAN_CACHE
-    if plan_code in _PLAN_CACHE:
-        return _PLAN_CACHE[plan_code]
-    resp = supabase.table("subscription_plans").select("*").eq("plan_code", plan_code).eq("is_active", True).limit(1).execute()
+    _reload_plans_if_stale()
+    with _plan_lock:
+        plan = _PLAN_CACHE.get(plan_code)
+        if plan is not None:
+            _PLAN_CACHE.move_to_end(plan_code)
+            return plan
+    # 預載之後才上架的方案：單筆補查
+    resp = get_supabase().table("subscription_plans").select("*").eq("plan_code", plan_code).eq("is_active", True).limit(1).execute()
     rows = resp.data or []
     if not rows:
         raise HTTPException(status_code=400, detail=f"unknown or inactive plan_code: {plan_code}")
-    _PLAN_CACHE[plan_code] = rows[0]
+    with _plan_lock:
+        _cache_plan(rows[0])
     return rows[0]
 
+# 已處理的 idempotency key（記憶體級 LRU + TTL）：付款方重送時直接回 idempotent，不必先打資料庫
+# 未命中時仍以 whitelist_events 的唯一鍵為準（多程序/重啟後）
+IDEM_CACHE_TTL = float(os.getenv("IDEM_CACHE_TTL", "86400"))
+IDEM_CACHE_MAX = int(os.getenv("IDEM_CACHE_MAX", "10000"))
+
+_IDEM_CACHE: "OrderedDict[str, float]" = OrderedDict()
+_idem_lock = threading.Lock()
+
+def _idem_seen(idem_key: str) -> bool:
+    with _idem_lock:
+        seen_at = _IDEM_CACHE.get(idem_key)
+        if seen_at is None:
+            return False
+        if time.time() - seen_at > IDEM_CACHE_TTL:
+            del _IDEM_CACHE[idem_key]
+            return False
+        return True
+
+def _idem_remember(idem_key: str) -> None:
+    with _idem_lock:
+        _IDEM_CACHE[idem_key] = time.time()
+        _IDEM_CACHE.move_to_end(idem_key)
+        while len(_IDEM_CACHE) > IDEM_CACHE_MAX:
+            _IDEM_CACHE.popitem(last=False)
+
 def _record_event(idem_key: str, kind: str, payload: Dict[str, Any]) -> bool:
     try:
-        supabase.table("whitelist_events").insert({
+        get_supabase().table("whitelist_events").insert({
             "idempotency_key": idem_key,
             "event_type": kind,
             "payload": payload,
             "created_at": datetime.utcnow().isoformat() + "Z",
         }).execute()
+        _idem_remember(idem_key)
         return True
     except Exception as e:
         if "duplicate" in str(e).lower() or "unique" in str(e).lower():
+            _idem_remember(idem_key)
             return False
         raise
 
-# ---------- Endpoints ----------
-@router.post("/upsert", status_code=200)
-async def upsert(
-    request: Request,
-    x_signature: Optional[str] = Header(default=None, alias="X-Signature"),
-    x_idem: Optional[str] = Header(default=None, alias="X-Idempotency-Key"),
-    body: UpsertBody = None,
-):
-    idem_key, raw = await _require_sig_and_key(request, x_signature, x_idem)
-    first_time = _record_event(idem_key, "upsert", json.loads(raw.decode("utf-8")))
+# 以下同步函式含 Supabase 呼叫，由 endpoint 以 run_in_threadpool 執行，不佔用 event loop
+def _apply_upsert(idem_key: str, payload: Dict[str, Any], body: UpsertBody) -> Dict[str, Any]:
+    first_time = _record_event(idem_key, "upsert", payload)
     if not first_time:
         return {"ok": True, "idempotent": True}
 
@@ -105,9 +195,38 @@ async def upsert(
         "status": "active",
         "updated_at": datetime.utcnow().isoformat() + "Z",
     }
-    supabase.table("bot_whitelist").upsert(rec, on_conflict="user_id").execute()
+    get_supabase().table("bot_whitelist").upsert(rec, on_conflict="user_id", returning="minimal").execute()
+    invalidate_whitelist()
+    return {"ok": True}
+
+def _apply_remove(idem_key: str, payload: Dict[str, Any], body: RemoveBody) -> Dict[str, Any]:
+    first_time = _record_event(idem_key, "remove", payload)
+    if not first_time:
+        return {"ok": True, "idempotent": True}
+
+    get_supabase().table("bot_whitelist").upsert({
+        "user_id": body.user_id,
+        "provider": body.provider,
+        "status": "removed",
+        "removed_reason": body.reason,
+        "updated_at": datetime.utcnow().isoformat() + "Z",
+    }, on_conflict="user_id", returning="minimal").execute()
+    invalidate_whitelist()
     return {"ok": True}
 
+# ---------- Endpoints ----------
+@router.post("/upsert", status_code=200)
+async def upsert(
+    request: Request,
+    x_signature: Optional[str] = Header(default=None, alias="X-Signature"),
+    x_idem: Optional[str] = Header(default=None, alias="X-Idempotency-Key"),
+    body: UpsertBody = None,
+):
+    idem_key, raw = await _require_sig_and_key(request, x_signature, x_idem)
+    if _idem_seen(idem_key):
+        return {"ok": True, "idempotent": True}
+    return await run_in_threadpool(_apply_upsert, idem_key, json.loads(raw.decode("utf-8")), body)
+
 @router.post("/remove", status_code=200)
 async def remove(
     request: Request,
@@ -116,18 +235,16 @@ async def remove(
     body: RemoveBody = None,
 ):
     idem_key, raw = await _require_sig_and_key(request, x_signature, x_idem)
-    first_time = _record_event(idem_key, "remove", json.loads(raw.decode("utf-8")))
-    if not first_time:
+    if _idem_seen(idem_key):
         return {"ok": True, "idempotent": True}
+    return await run_in_threadpool(_apply_remove, idem_key, json.loads(raw.decode("utf-8")), body)
 
-    supabase.table("bot_whitelist").upsert({
-        "user_id": body.user_id,
-        "provider": body.provider,
-        "status": "removed",
-        "removed_reason": body.reason,
-        "updated_at": datetime.utcnow().isoformat() + "Z",
-    }, on_conflict="user_id").execute()
-    return {"ok": True}
+@router.post("/refresh_plans")
+async def refresh_plans(request: Request, x_signature: Optional[str] = Header(default=None, alias="X-Signature")):
+    raw = await request.body()
+    if not x_signature or not _hmac_ok(raw, x_signature):
+        raise HTTPException(status_code=401, detail="invalid signature")
+    return {"ok": True, "plans": await run_in_threadpool(preload_plans)}
 
 @router.post("/echo")
 async def echo(request: Request, x_signature: Optional[str] = Header(default=None, alias="X-Signature")):
@@ -0,0 +1,62 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+def run_jobs(jobs, max_workers=4, timeout=120, label="jobs", poll=0.5):
+    """
+    以 thread pool 並行執行互相獨立的工作，單一工作失敗或逾時不影響其他工作。
+    jobs: {name: callable}；timeout: 每個工作自開始執行起算的秒數上限。
+    回傳 {name: {"status": "ok"|"error"|"timeout", "seconds", "result", "error"}}
+    （逾時的工作無法強制中止，會在背景跑完，但結果不再採用）
+    """
+    results = {}
+    started_at = {}
+    lock = threading.Lock()
+
+    def _wrap(name, func):
+        def _run():
+            with lock:
+                started_at[name] = time.perf_counter()
+            return func()
+        return _run
+
+    t0 = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=label)
+    futures = {executor.submit(_wrap(name, func)): name for name, func in jobs.items()}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=poll, return_when=FIRST_COMPLETED)
+            now = time.perf_counter()
+            for fut in done:
+                name = futures[fut]
+                seconds = now - started_at.get(name, now)
+                try:
+                    results[name] = {"status": "ok", "seconds": seconds, "result": fut.result(), "error": None}
+                except Exception as e:
+                    results[name] = {"status": "error", "seconds": seconds, "result": None, "error": repr(e)}
+            with lock:
+                expired = {f for f in pending
+                           if futures[f] in started_at and now - started_at[futures[f]] > timeout}
+            for fut in expired:
+                name = futures[fut]
+                results[name] = {"status": "timeout", "seconds": now - started_at[name], "result": None,
+                                 "error": f"超過 {timeout}s 未完成"}
+            pending -= expired
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print_job_summary(results, time.perf_counter() - t0, label=label, order=list(jobs))
+    return results
+
+def print_job_summary(results, elapsed, label="jobs", order=None):
+    ok = sum(1 for r in results.values() if r["status"] == "ok")
+    print(f"[SUMMARY] {label}：{ok}/{len(results)} 成功，總耗時 {elapsed:.2f}s")
+    for name in order or results:
+        r = results.get(name)
+        if r is None:
+            continue
+        line = f"  {r['status']:<7} {r['seconds']:7.2f}s  {name}"
+        if r["error"]:
+            line += f"  {r['error']}"
+        print(line)
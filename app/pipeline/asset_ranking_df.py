@@ -1,26 +1,54 @@
 import pandas as pd
-import re
-
-def parse_market_cap_symbol(s):
-    if not isinstance(s, str):
-        return 0
-    s = s.replace("$", "").replace(",", "").strip()
-    match = re.match(r'([0-9.]+)\s*([TBM]?)', s)
-    if not match:
-        return 0
-    num, unit = match.groups()
-    try:
-        num = float(num)
-    except Exception:
-        return 0
-    unit_map = {"T": 1e12, "B": 1e9, "M": 1e6}
-    mult = unit_map.get(unit.upper(), 1)
-    return num * mult
+
+UNIT_MULTIPLIER = {"T": 1e12, "B": 1e9, "M": 1e6}
+# "$1.23 T"、"$987.6 B"、"$1,234.5"（去掉 $ 與千分位後）→ 數字 + 單位
+_CAP_PATTERN = r"^([0-9.]+)\s*([TBMtbm]?)"
+
+def _as_str(values):
+    """回傳 (原始 Series, 字串欄)；非字串（None/NaN/數字）在字串欄為 <NA>"""
+    raw = pd.Series(values, dtype=object)
+    return raw, raw.where(raw.map(type).eq(str)).astype("string")
+
+def _clean(text):
+    return text.str.replace(r"[$,]", "", regex=True).str.strip()
+
+def parse_market_cap(values):
+    """
+    市值字串整欄解析（一次 str.extract），回傳 DataFrame：
+      market_cap_num  數值（無法解析或非字串為 0）
+      market_cap_zh   顯示用「x.x兆」；非兆單位保留原字串，非字串為 "-"
+    """
+    raw, text = _as_str(values)
+    parts = _clean(text).str.extract(_CAP_PATTERN)
+    num = pd.to_numeric(parts[0], errors="coerce").astype(float)
+    unit = parts[1].str.upper()
+    value = (num * unit.map(UNIT_MULTIPLIER).astype(float).fillna(1)).fillna(0)
+
+    is_trillion = (unit == "T").fillna(False).astype(bool) & num.notna()
+    display = raw.where(text.notna(), "-")
+    display = display.mask(is_trillion, num[is_trillion].map("{:.1f}兆".format))
+    return pd.DataFrame({"market_cap_num": value, "market_cap_zh": display}, index=raw.index)
+
+def parse_price_display(values):
+    """價格字串整欄轉數字後格式化為「1,234.5」；缺值為「-」，無法解析為「nan」"""
+    raw, text = _as_str(values)
+    num = pd.to_numeric(_clean(text), errors="coerce").astype(float)
+    num = num.fillna(pd.to_numeric(raw.where(text.isna()), errors="coerce"))
+    return num.map("{:,.1f}".format).where(raw.notna(), "-")
+
+def add_asset_display_columns(df):
+    """推播用顯示欄位：price_display、short_name（名稱最後一段）、market_cap_zh"""
+    df = df.copy()
+    df["price_display"] = parse_price_display(df["market_cap"])
+    raw, names = _as_str(df["name"])
+    df["short_name"] = names.str.strip().str.split().str[-1].astype(object).where(lambda s: s.notna(), raw)
+    df["market_cap_zh"] = parse_market_cap(df["symbol"])["market_cap_zh"]
+    return df
 
 def asset_top10_to_df(asset_list, date):
     df = pd.DataFrame(asset_list)
     # 這裡的 symbol 就是市值欄位（字串），直接轉成 market_cap_num
-    df['market_cap_num'] = df['symbol'].apply(parse_market_cap_symbol)
+    df['market_cap_num'] = parse_market_cap(df['symbol'])['market_cap_num']
     print(df[['symbol', 'market_cap_num']])
     df['date'] = date
     return df
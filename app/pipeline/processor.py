@@ -1,21 +1,101 @@
+from itertools import chain
+import numpy as np
 import pandas as pd
-import datetime
+from tzlocal import get_localzone_name
+
+# Coinglass 回傳的都是「每天一筆、陣列/巢狀陣列」結構，以下一律整欄轉換（時間戳一次轉完、巢狀 ETF 清單整批展開），
+# 不逐筆呼叫 fromtimestamp / pd.to_datetime
+
+def ms_to_date(ms, local=False):
+    """毫秒時間戳（list/Series）→ 'YYYY-MM-DD' Series；local=True 以本機時區換日（同 datetime.fromtimestamp）"""
+    ts = pd.to_datetime(pd.Series(ms, dtype="int64") // 1000 * 1000, unit="ms")
+    if local:
+        ts = ts.dt.tz_localize("UTC").dt.tz_convert(get_localzone_name()).dt.tz_localize(None)
+    return ts.dt.strftime("%Y-%m-%d")
+
+def _coalesce(frame, *cols, default=None):
+    """逐列取第一個非缺值的欄位，都沒有則 default"""
+    out = None
+    for col in cols:
+        if col in frame:
+            out = frame[col] if out is None else out.fillna(frame[col])
+    if out is None:
+        return pd.Series(default, index=frame.index, dtype=object)
+    return out if default is None else out.fillna(default)
 
 def process_etf_flows_json(json_data, symbol):
     # 解析 Coinglass flow-history 結構，產出 DataFrame
-    flows = []
-    for day in json_data['data']:
-        date = datetime.datetime.fromtimestamp(day['timestamp']//1000).strftime('%Y-%m-%d')
-        total = day.get('flow_usd', day.get('change_usd', 0))
-        etf_flows = day.get('etf_flows') or day.get('etf_flow') or day.get('etf_flows', [])
-        for etf in etf_flows:
-            flows.append({
-                "date": date,
-                "asset": symbol,
-                "etf_ticker": etf['etf_ticker'] if 'etf_ticker' in etf else etf.get('ticker', ''),
-                "flow_usd": etf['flow_usd'] if 'flow_usd' in etf else etf.get('change_usd', 0),
-                "total_flow_usd": total,
-                "price_usd": day.get('price_usd') or day.get('price') or None
-            })
-    df = pd.DataFrame(flows)
-    return df
+    data = json_data['data']
+    if not data:
+        return pd.DataFrame()
+    etf_lists = [d.get('etf_flows') or d.get('etf_flow') or [] for d in data]
+    lengths = np.fromiter((len(x) for x in etf_lists), dtype=np.int64, count=len(etf_lists))
+    if not lengths.sum():
+        return pd.DataFrame()
+
+    days = pd.DataFrame(data).drop(columns=["etf_flows", "etf_flow"], errors="ignore")
+    dates = ms_to_date(days["timestamp"], local=True)
+    totals = _coalesce(days, "flow_usd", "change_usd", default=0)
+    # price 為 0 視同缺值（同 `day.get('price_usd') or day.get('price')`）
+    prices = days.reindex(columns=["price_usd", "price"])
+    prices = _coalesce(prices.where(prices != 0), "price_usd", "price")
+
+    # 每日的 ETF 清單整批攤平成一列一檔，當日欄位依清單長度重複
+    day_idx = np.repeat(np.arange(len(data)), lengths)
+    etfs = pd.DataFrame.from_records(list(chain.from_iterable(etf_lists)))
+    return pd.DataFrame({
+        "date": dates.to_numpy()[day_idx],
+        "asset": symbol,
+        "etf_ticker": _coalesce(etfs, "etf_ticker", "ticker", default=""),
+        "flow_usd": _coalesce(etfs, "flow_usd", "change_usd", default=0),
+        "total_flow_usd": totals.to_numpy()[day_idx],
+        "price_usd": prices.to_numpy()[day_idx],
+    })
+
+def exchange_balance_history_to_df(time_list, data_map):
+    """/api/exchange/balance/chart → 每天每個交易所一筆（date, exchange, btc_balance），None 略過"""
+    n = len(time_list)
+    dates = ms_to_date(time_list)
+    wide = pd.DataFrame({
+        exch: pd.to_numeric(pd.Series(balance_list[:n], dtype=object), errors="coerce")
+        for exch, balance_list in data_map.items()
+    }, index=range(n))
+    # 交易所為外層、日期為內層（同原本逐所逐日的順序）
+    long = wide.melt(var_name="exchange", value_name="btc_balance", ignore_index=False).dropna(subset=["btc_balance"])
+    return pd.DataFrame({
+        "date": dates.reindex(long.index).to_numpy(),
+        "exchange": long["exchange"].to_numpy(),
+        "btc_balance": long["btc_balance"].astype(float).to_numpy(),
+    })
+
+def fear_greed_to_df(data_list, time_list):
+    """/api/index/fear-greed-history → (date, score)"""
+    n = min(len(data_list), len(time_list))
+    return pd.DataFrame({
+        "date": ms_to_date(time_list[:n]),
+        "score": pd.Series(data_list[:n]).astype(float).astype(int),
+    })
+
+def funding_rate_to_df(rows, exchange, symbol):
+    """/api/futures/funding-rate/history → (date, exchange, symbol, open, high, low, close)"""
+    df = pd.DataFrame(rows)
+    out = pd.DataFrame({"date": ms_to_date(df["time"]), "exchange": exchange, "symbol": symbol})
+    for col in ["open", "high", "low", "close"]:
+        out[col] = df[col].astype(float)
+    return out
+
+def whale_alert_to_df(rows, symbol, today):
+    """/api/hyperliquid/whale-alert → 每筆異動一列（缺欄位補預設值）"""
+    df = pd.DataFrame(rows)
+    return pd.DataFrame({
+        "date": today,
+        "symbol": _coalesce(df, "symbol", default=symbol),
+        "user_address": _coalesce(df, "user", default=""),
+        "position_size": _coalesce(df, "position_size", default=0).astype(float),
+        "position_action": _coalesce(df, "position_action", default=0).astype(int),
+        "position_value_usd": _coalesce(df, "position_value_usd", default=0).astype(float),
+        "entry_price": _coalesce(df, "entry_price", default=0).astype(float),
+        "liq_price": _coalesce(df, "liq_price", default=0).astype(float),
+        "tx_time": pd.to_datetime(_coalesce(df, "create_time", default=0).astype("int64"), unit="ms")
+                     .dt.strftime("%Y-%m-%d %H:%M:%S"),
+    }, index=df.index)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# 各表讀進記憶體後的欄位型別（timeseries_store、query_etf_flows_all 共用）
+# - date 只解析一次為 datetime64
+# - category：代號類欄位（資產、ETF 代號、交易所、幣種），重複度高
+# - float64：金額/數量欄（USD、BTC），只轉數值不縮小：float32 約 7 位有效數字，兆級金額會差到數萬美元，
+#   而這些值會進最大流入/流出、中位數與圖表標籤
+# - float32：只用於比率/百分比（funding rate、持幣占比），7 位有效數字綽綽有餘
+# - int32：值域允許且無缺值才縮小，否則保留原型別
+SCHEMAS = {
+    "etf_flows": {
+        "category": ["asset", "etf_ticker"],
+        "float64": ["flow_usd", "total_flow_usd", "price_usd"],
+    },
+    "fear_greed_index": {"int32": ["score"]},
+    "funding_rate": {
+        "category": ["exchange", "symbol"],
+        "float32": ["open", "high", "low", "close"],
+    },
+    "exchange_btc_balance": {"category": ["exchange"], "float64": ["btc_balance"]},
+    "whale_alert": {
+        "category": ["symbol"],
+        "int32": ["position_action"],
+        "float64": ["position_size", "position_value_usd", "entry_price", "liq_price"],
+    },
+    "btc_holder_distribution": {
+        "category": ["category", "source"],
+        "float64": ["btc_count"],
+        "float32": ["percent"],
+    },
+    "global_asset_snapshot": {"int32": ["rank"], "float64": ["market_cap_num"]},
+}
+
+# 比率欄縮成 float32 前的檢查：超出 float32 範圍（溢位成 inf）或極小值（變 0 / subnormal）就保留 float64
+FLOAT32_RTOL = 1e-6
+_INT32 = np.iinfo(np.int32)
+
+def memory_bytes(df):
+    """DataFrame 實際佔用記憶體（含 object 字串內容）"""
+    return int(df.memory_usage(deep=True).sum())
+
+def _to_float32(values):
+    num = pd.to_numeric(values, errors="coerce").astype("float64")
+    arr = num.to_numpy()
+    finite = np.isfinite(arr)
+    with np.errstate(over="ignore", under="ignore"):
+        small = arr.astype("float32")
+    if not np.allclose(small[finite], arr[finite], rtol=FLOAT32_RTOL, atol=0):
+        return num
+    return pd.Series(small, index=num.index, name=num.name)
+
+def _to_int32(values):
+    num = pd.to_numeric(values, errors="coerce")
+    if num.isna().any() or not num.between(_INT32.min, _INT32.max).all() or not (num % 1 == 0).all():
+        return num
+    return num.astype("int32")
+
+def apply_schema(df, schema, report=False):
+    """
+    依 SCHEMAS[schema] 整理欄位型別，回傳新的 DataFrame（不改動原本的）；
+    不在 SCHEMAS 的表只解析 date。report=True 時印出整理前後的記憶體。
+    """
+    spec = SCHEMAS.get(schema, {})
+    before = memory_bytes(df) if report else None
+    df = df.copy()
+    if "date" in df and not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df["date"] = pd.to_datetime(df["date"])
+    for col in spec.get("category", []):
+        if col not in df:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+        else:
+            df[col] = df[col].astype("category")
+    for col in spec.get("int32", []):
+        if col in df:
+            df[col] = _to_int32(df[col])
+    for col in spec.get("float64", []):
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in spec.get("float32", []):
+        if col in df:
+            df[col] = _to_float32(df[col])
+    if report:
+        after = memory_bytes(df)
+        print(f"[LOG] {schema} 記憶體：{before / 1e6:.2f}MB → {after / 1e6:.2f}MB"
+              f"（{len(df)} 筆，{after / max(before, 1):.0%}）")
+    return df
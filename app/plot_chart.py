@@ -1,4 +1,6 @@
+import io
 import os
+import threading
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')
@@ -22,13 +24,23 @@ def get_font_properties():
     except Exception as e:
         print(f"[ERROR] 載入字型失敗: {e}")
         return fm.FontProperties()
-myfont = get_font_properties()
-plt.rcParams['axes.unicode_minus'] = False
+_font = None
+_font_lock = threading.Lock()
 
-def plot_etf_bar_chart(df: pd.DataFrame, symbol: str, days: int = 30) -> str:
+def ensure_font():
+    """第一次畫圖時才載入字型（import 時不載入，縮短排程/webhook 啟動時間）"""
+    global _font
+    with _font_lock:
+        if _font is None:
+            _font = get_font_properties()
+            plt.rcParams['axes.unicode_minus'] = False
+        return _font
+
+def plot_etf_bar_chart(df: pd.DataFrame, symbol: str, days: int = 30) -> io.BytesIO:
     """
-    畫 ETF 近 N 日資金流長條圖 (2:1)，並輸出 PNG 檔。
+    畫 ETF 近 N 日資金流長條圖 (2:1)，回傳記憶體中的 PNG（BytesIO）。
     """
+    ensure_font()
     # 1. 複製資料並取最近 days 筆
     df = df.copy()
     df['date'] = pd.to_datetime(df['date'])
@@ -84,19 +96,22 @@ def plot_etf_bar_chart(df: pd.DataFrame, symbol: str, days: int = 30) -> str:
     for spine in ax.spines.values():
         spine.set_color('white')
 
-    # 8. 輸出 PNG，去除所有外圍空白
-    img_path = f"etf_{symbol}_bar_{daily['date'].min().date()}_{daily['date'].max().date()}.png"
+    # 8. 輸出 PNG 到記憶體，去除所有外圍空白
+    buf = io.BytesIO()
     plt.savefig(
-        img_path,
+        buf,
+        format='png',
         dpi=270,
         bbox_inches='tight',  # 緊貼內容裁剪
         pad_inches=0,         # 無額外邊距
         transparent=False
     )
     plt.close(fig)
-    return img_path
+    buf.seek(0)
+    return buf
 
 def plot_etf_history_line_chart(df, symbol):
+    ensure_font()
     matplotlib.rcParams['axes.unicode_minus'] = False
     df = df.copy()
     df['date'] = pd.to_datetime(df['date'])
@@ -121,17 +136,19 @@ def plot_etf_history_line_chart(df, symbol):
         spine.set_color('white')
     plt.grid(axis='y', color='#bbb', linestyle='--', linewidth=1.0, alpha=0.4)
     plt.tight_layout()
-    img_path = f"etf_{symbol}_history_line.png"
-    plt.savefig(img_path, dpi=270, bbox_inches='tight', transparent=False)
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=270, bbox_inches='tight', transparent=False)
     plt.close()
-    return img_path
+    buf.seek(0)
+    return buf
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
 def plot_asset_top10_bar_chart(df: pd.DataFrame, today: str,
                                unit_str: str = '兆',
-                               unit_div: float = 1e12) -> str:
+                               unit_div: float = 1e12) -> io.BytesIO:
+    ensure_font()
     fig, ax = plt.subplots(figsize=(12, 6), facecolor='#191E24')
     ax.set_facecolor('#191E24')
     plt.tight_layout(pad=0)
@@ -156,7 +173,8 @@ def plot_asset_top10_bar_chart(df: pd.DataFrame, today: str,
         ax.text(v, i, f"{v:,.2f}{unit_str}", va='center', fontsize=13, color='white')
     ax.set_title(f"{today} 全球資產市值 Top10（{unit_str} 美元）", fontsize=20, pad=10, color='white')
     ax.set_xlabel(f"市值（{unit_str} 美元）", fontsize=16)
-    img_path = f"asset_top10_bar_{today}.png"
-    plt.savefig(img_path, dpi=200, bbox_inches='tight', pad_inches=0, transparent=False)
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=200, bbox_inches='tight', pad_inches=0, transparent=False)
     plt.close(fig)
-    return img_path
+    buf.seek(0)
+    return buf
@@ -1,11 +1,13 @@
+import io
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
 import pandas as pd
 from app.utils import BTC_HOLDER_COLOR_MAP
-from app.utils import BTC_HOLDER_COLOR_MAP
+from app.plot_chart import ensure_font
 
-def plot_btc_holder_pie(df: pd.DataFrame, date_str: str) -> str:
+def plot_btc_holder_pie(df: pd.DataFrame, date_str: str) -> io.BytesIO:
+    ensure_font()
     fig, ax = plt.subplots(figsize=(8, 8), facecolor="#191E24")
     ax.set_facecolor("#191E24")
     plt.tight_layout(pad=0)
@@ -30,13 +32,15 @@ def plot_btc_holder_pie(df: pd.DataFrame, date_str: str) -> str:
     for t in texts + autotexts:
         t.set_color("white")
     ax.set_title(f"BTC 2100萬顆持幣分布（{date_str}）", fontsize=20, color="white")
-    img_path = f"btc_holder_pie_{date_str}.png"
+    buf = io.BytesIO()
     plt.savefig(
-        img_path,
+        buf,
+        format='png',
         dpi=200,
         bbox_inches='tight',
         pad_inches=0,
         transparent=False
     )
     plt.close(fig)
-    return img_path
+    buf.seek(0)
+    return buf
@@ -0,0 +1,40 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 管理指令（全歷史補抓、建 carousel + 推播…）常需數分鐘，改在背景 worker 執行，webhook 立即回覆
+ADMIN_JOB_WORKERS = int(os.getenv("ADMIN_JOB_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=ADMIN_JOB_WORKERS, thread_name_prefix="admin_job")
+_inflight = {}
+_lock = threading.Lock()
+
+def submit_admin_job(key, func, notify):
+    """
+    背景執行管理指令。func() 回傳完成訊息（None 表示不通知），完成或失敗時以 notify(text) 回報。
+    相同 key 的指令執行中時不重複執行，合併到同一次。
+    回傳 True 表示已建立新工作，False 表示已合併到執行中的工作。
+    """
+    with _lock:
+        if key in _inflight:
+            return False
+
+        def _run():
+            started = time.perf_counter()
+            try:
+                message = func()
+            except Exception as e:
+                message = f"❌ {key} 執行失敗：{e}"
+            finally:
+                with _lock:
+                    _inflight.pop(key, None)
+            print(f"[LOG] 管理指令 {key} 完成，耗時 {time.perf_counter() - started:.1f}s")
+            if message:
+                try:
+                    notify(message)
+                except Exception as e:
+                    print(f"[ERROR] 管理指令結果通知失敗 {key}: {e}")
+
+        _inflight[key] = _executor.submit(_run)
+        return True
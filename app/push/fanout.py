@@ -0,0 +1,114 @@
+import os
+import time
+import uuid
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from linebot.exceptions import LineBotApiError
+from app.rate_limiter import TokenBucket
+from app.db import insert_push_deliveries
+
+# LINE push API 每個 channel 上限約 2,000 req/s，預設保守取 200 req/s
+LINE_PUSH_RATE = float(os.getenv("LINE_PUSH_RATE", "200"))
+LINE_PUSH_WORKERS = int(os.getenv("LINE_PUSH_WORKERS", "16"))
+LINE_PUSH_RETRIES = int(os.getenv("LINE_PUSH_RETRIES", "3"))
+# multicast（預設）：同內容一次送最多 500 人；push：逐一推播
+LINE_PUSH_MODE = os.getenv("LINE_PUSH_MODE", "multicast")
+MULTICAST_BATCH_SIZE = 500
+
+_limiter = TokenBucket(LINE_PUSH_RATE)
+
+def _is_transient(e):
+    if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(e, LineBotApiError):
+        message = getattr(e.error, "message", "") or ""
+        # 429 也可能是「本月額度已用完」，那種重試無效
+        if e.status_code == 429:
+            return "monthly limit" not in message.lower()
+        return e.status_code >= 500
+    return False
+
+def _send_with_retry(send, retry_key):
+    """以同一 retry key 重試暫時性錯誤；回傳 (成功與否, 嘗試次數, 錯誤訊息)"""
+    for attempt in range(1, LINE_PUSH_RETRIES + 2):
+        _limiter.acquire()
+        try:
+            send(retry_key)
+            return True, attempt, None
+        except Exception as e:
+            # 409：同一 retry key 先前已被接受，視為成功
+            if isinstance(e, LineBotApiError) and e.status_code == 409:
+                return True, attempt, None
+            if not _is_transient(e) or attempt > LINE_PUSH_RETRIES:
+                return False, attempt, str(e)[:500]
+            time.sleep(min(8.0, 0.5 * 2 ** (attempt - 1)))
+
+def _push_one(line_bot_api, to_id, messages):
+    # 同一則推播的重試共用 retry key，LINE 端據此去重，不會重複送達
+    ok, attempts, error = _send_with_retry(
+        lambda key: line_bot_api.push_message(to_id, messages, retry_key=key), str(uuid.uuid4()))
+    return {"user_id": to_id, "status": "sent" if ok else "failed", "mode": "push",
+            "attempts": attempts, "error": error}
+
+def _push_individual(target_ids, messages, line_bot_api):
+    if not target_ids:
+        return []
+    with ThreadPoolExecutor(max_workers=min(LINE_PUSH_WORKERS, len(target_ids))) as executor:
+        return list(executor.map(lambda to_id: _push_one(line_bot_api, to_id, messages), target_ids))
+
+def _multicast_one(line_bot_api, batch, messages):
+    ok, attempts, error = _send_with_retry(
+        lambda key: line_bot_api.multicast(batch, messages, retry_key=key), str(uuid.uuid4()))
+    if not ok:
+        print(f"[WARN] multicast {len(batch)} 人失敗，改逐一推播：{error}")
+        return [], batch
+    return [{"user_id": to_id, "status": "sent", "mode": "multicast", "attempts": attempts, "error": None}
+            for to_id in batch], []
+
+def _multicast(user_ids, messages, line_bot_api):
+    """每批最多 500 個 user ID 一次送出；回傳 (結果, 需改逐一推播的 ID)"""
+    batches = [user_ids[i:i+MULTICAST_BATCH_SIZE] for i in range(0, len(user_ids), MULTICAST_BATCH_SIZE)]
+    if not batches:
+        return [], []
+    results, fallback = [], []
+    with ThreadPoolExecutor(max_workers=min(LINE_PUSH_WORKERS, len(batches))) as executor:
+        for res, failed in executor.map(lambda b: _multicast_one(line_bot_api, b, messages), batches):
+            results += res
+            fallback += failed
+    return results, fallback
+
+def fan_out_push(target_ids, messages, line_bot_api, label="push", mode=None):
+    """
+    推播給多個對象，回傳每個對象的結果清單，並寫入 push_deliveries 留存。
+    mode="multicast"（預設）：user 以每批 500 人 multicast；群組/聊天室（multicast 不支援）
+        與 multicast 失敗的批次改逐一推播。
+    mode="push"：全部以有界 thread pool 並行逐一推播。
+    每次請求經 token bucket 限流，暫時性錯誤自動重試。
+    """
+    if not target_ids:
+        return []
+    mode = mode or LINE_PUSH_MODE
+    push_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    if mode == "multicast":
+        user_ids = [t for t in target_ids if t.startswith("U")]
+        others = [t for t in target_ids if not t.startswith("U")]
+        results, fallback = _multicast(user_ids, messages, line_bot_api)
+        results += _push_individual(others + fallback, messages, line_bot_api)
+    else:
+        results = _push_individual(target_ids, messages, line_bot_api)
+    elapsed = time.perf_counter() - started
+
+    sent = sum(1 for r in results if r["status"] == "sent")
+    print(f"[LOG] {label}（{mode}）：{sent}/{len(results)} 成功，耗時 {elapsed:.2f}s")
+    for r in results:
+        if r["status"] != "sent":
+            print(f"推播失敗 {r['user_id']}: {r['error']}")
+
+    now = datetime.datetime.utcnow().isoformat() + "Z"
+    try:
+        insert_push_deliveries([{**r, "push_id": push_id, "label": label, "created_at": now} for r in results])
+    except Exception as e:
+        print(f"[WARN] 推播結果寫入失敗：{e}")
+    return results
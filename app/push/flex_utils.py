@@ -1,8 +1,11 @@
+import os
 import datetime
 import pandas as pd
-from app.db import query_etf_flows_all
-from app.plot_chart import plot_etf_bar_chart, plot_etf_history_line_chart, plot_asset_top10_bar_chart
-from app.push.push_etf_chart import upload_to_r2
+from app import timeseries_store
+from app.etf_flow_stats import get_etf_stats
+from app.render_cache import render_chart_url, render_chart_urls
+from app.push.push_etf_chart import wait_until_ready
+from app.job_runner import run_jobs
 from app.utils import (
     etf_flex_table_single_day,
     human_unit,
@@ -10,38 +13,10 @@ from app.utils import (
     get_recent_n_days_settled,
     get_all_settled_until
 )
-from app.fetcher.asset_ranking import fetch_global_asset_top10
-from app.pipeline.asset_ranking_df import asset_top10_to_df, parse_market_cap_symbol
+from app.fetcher.daily_asset_snapshot import get_asset_top10_df
+from app.pipeline.asset_ranking_df import add_asset_display_columns
 from app.push.push_btc_holder import get_flex_bubble_btc_holder
 
-# ---- 防呆包裝，每張 bubble 報錯不會中斷主流程 ----
-def safe_bubble(bubble_func, *args, **kwargs):
-    try:
-        print(f"[DEBUG] 開始產生 {bubble_func.__name__}")
-        result = bubble_func(*args, **kwargs)
-        print(f"[DEBUG] {bubble_func.__name__} 完成")
-        return result
-    except Exception as e:
-        print(f"[ERROR] {bubble_func.__name__} 產生失敗：{e}")
-        return None
-
-def en_unit_to_zh_and_fmt(s):
-    """市值字串轉中文單位（for display）"""
-    s = str(s).replace("$", "").strip()
-    import re
-    match = re.match(r'([0-9.]+)\s*([TBM]?)', s)
-    if match:
-        num, unit = match.groups()
-        try:
-            num_fmt = f"{float(num):,.1f}"
-        except:
-            num_fmt = num
-        unit_map = {"T": "兆", "B": "億", "M": "百萬"}
-        zh_unit = unit_map.get(unit, unit)
-        return f"{num_fmt}{zh_unit}"
-    else:
-        return s
-
 def get_asset_competition_flex(today, df, img_url, market_cap_header):
     trophy = [f"{i+1:02d}" for i in range(len(df))]
     body_contents = [
@@ -109,12 +84,21 @@ def safe_number(val):
     return val
 
 def get_flex_bubble_etf(symbol, df_all, target_date, days=30):
+    # matplotlib 只在實際畫圖時載入，webhook/排程啟動不必負擔
+    from app.plot_chart import plot_etf_bar_chart, plot_etf_history_line_chart
+
     # 單日
     df_day = df_all[df_all['date'] == pd.Timestamp(target_date)].copy()
     total_today = df_day['flow_usd'].sum()
     etf_today_table = etf_flex_table_single_day(df_day)
     df_14d = get_recent_n_days_settled(df_all, target_date, n=days)
-    img_14d = upload_to_r2(plot_etf_bar_chart(df_14d, symbol, days=days))
+    df_history = get_all_settled_until(df_all, target_date)
+    # 兩張圖同時送進繪圖 process pool
+    imgs = render_chart_urls({
+        "14d": (plot_etf_bar_chart, (df_14d, symbol), {"days": days}),
+        "hist": (plot_etf_history_line_chart, (df_history, symbol), {}),
+    })
+    img_14d, img_hist = imgs["14d"], imgs["hist"]
 
     bubble_14d = {
         "type": "bubble",
@@ -139,15 +123,13 @@ def get_flex_bubble_etf(symbol, df_all, target_date, days=30):
     }
 
     # 歷史
-    df_history = get_all_settled_until(df_all, target_date)
-    img_hist = upload_to_r2(plot_etf_history_line_chart(df_history, symbol))
-    total_flows_hist = df_history['total_flow_usd'].astype(float)
-    nonzero_median_hist = safe_number(total_flows_hist[total_flows_hist != 0].median())
-    mean_hist = safe_number(total_flows_hist.mean())
-    max_in_hist = safe_number(total_flows_hist.max())
-    max_out_hist = safe_number(total_flows_hist.min())
-    max_in_date_hist = df_history.loc[total_flows_hist.idxmax(), 'date'].strftime('%Y-%m-%d') if not df_history.empty else ""
-    max_out_date_hist = df_history.loc[total_flows_hist.idxmin(), 'date'].strftime('%Y-%m-%d') if not df_history.empty else ""
+    # 歷史統計只讀預先維護的逐日彙總（寫入端增量更新/建立），推播端不掃描、不重建全歷史
+    stats = get_etf_stats(symbol, target_date) or {}
+    nonzero_median_hist = safe_number(stats.get('nonzero_median'))
+    mean_hist = safe_number(stats.get('mean'))
+    max_in_hist, max_in_date_hist = stats.get('max_in', [None, "-"])
+    max_out_hist, max_out_date_hist = stats.get('max_out', [None, "-"])
+    max_in_hist, max_out_hist = safe_number(max_in_hist), safe_number(max_out_hist)
 
     bubble_hist = {
         "type": "bubble",
@@ -163,7 +145,7 @@ def get_flex_bubble_etf(symbol, df_all, target_date, days=30):
             "backgroundColor": "#191E24",
             "contents": [
                 {"type": "text", "text": f"{symbol} ETF 全歷史資金流", "weight": "bold", "size": "xl", "color": "#F5FAFE"},
-                {"type": "text", "text": f"{df_history['date'].min().strftime('%Y-%m-%d')} ~ {df_history['date'].max().strftime('%Y-%m-%d')}", "size": "md", "color": "#F5FAFE"},
+                {"type": "text", "text": f"{stats.get('first_date', '-')} ~ {stats.get('last_date', '-')}", "size": "md", "color": "#F5FAFE"},
                 {"type": "text", "text": f"最大單日淨流入：", "size": "md", "color": "#F5FAFE", "margin": "md"},
                 {"type": "text", "text": f"{human_unit(max_in_hist)}（{max_in_date_hist}）", "size": "md", "color": "#00b300", "weight": "bold", "margin": "sm"},
                 {"type": "text", "text": f"最大單日淨流出：", "size": "md", "color": "#F5FAFE", "margin": "md"},
@@ -177,87 +159,54 @@ def get_flex_bubble_etf(symbol, df_all, target_date, days=30):
     }
     return bubble_14d, bubble_hist
 
-def get_full_flex_carousel():
-    print("========== 產生 Flex Carousel ==========")
-    # BTC ETF
-    df_btc = query_etf_flows_all("BTC")
-    df_btc['date'] = pd.to_datetime(df_btc['date'])
-    target_btc_date = df_btc['date'].max()
-    btc_bubble_14d, btc_bubble_hist = (None, None)
-    try:
-        btc_bubble_14d, btc_bubble_hist = get_flex_bubble_etf("BTC", df_btc, target_btc_date)
-        print("[DEBUG] btc_bubble_14d/btc_bubble_hist 完成")
-    except Exception as e:
-        print(f"[ERROR] btc ETF bubble 失敗：{e}")
+def get_etf_bubbles(symbol):
+    """讀取某資產 ETF flow 並產生（近 30 日 bubble, 全歷史 bubble）"""
+    df_all = timeseries_store.get_range("etf_flows", asset=symbol)
+    target_date = df_all['date'].max()
+    print(f"[DEBUG] {symbol} 最新日期:", target_date)
+    return get_flex_bubble_etf(symbol, df_all, target_date)
 
-    # ETH ETF
-    df_eth = query_etf_flows_all("ETH")
-    df_eth['date'] = pd.to_datetime(df_eth['date'])              # <== 這行保證正確型別
-    target_eth_date = df_eth['date'].max()
-    print("[DEBUG] ETH 最新日期:", target_eth_date)
-    
-    eth_bubble_14d, eth_bubble_hist = (None, None)
-    try:
-        eth_bubble_14d, eth_bubble_hist = get_flex_bubble_etf("ETH", df_eth, target_eth_date)
-        print("[DEBUG] eth_bubble_14d/eth_bubble_hist 完成")
-    except Exception as e:
-        print(f"[ERROR] eth ETF bubble 失敗：{e}")
+def get_flex_bubble_asset():
+    from app.plot_chart import plot_asset_top10_bar_chart
 
     # ------ 市值 Top10 FLEX，這裡保證你資料格式正確 ------
-    flex_asset = None
-    try:
-        today = datetime.date.today().strftime('%Y-%m-%d')
-        asset_list = fetch_global_asset_top10()
-        df_asset = asset_top10_to_df(asset_list, today)
-        print(df_asset[['name', 'symbol', 'market_cap', 'market_cap_num']])
-
-        def parse_float_safe(x):
-            try:
-                if isinstance(x, str):
-                    x = x.replace("$", "").replace(",", "").strip()
-                return float(x)
-            except Exception:
-                return float('nan')
-
-        df_asset['price_display'] = df_asset['market_cap'].apply(
-            lambda x: f"{parse_float_safe(x):,.1f}" if pd.notnull(x) else "-"
-        )
-
-        def symbol_to_zh_t(val):
-            import re
-            if not isinstance(val, str):
-                return "-"
-            match = re.match(r'\$?([\d.]+)\s*T', val)
-            if match:
-                num = float(match.group(1))
-                return f"{num:.1f}兆"
-            return val
+    today = datetime.date.today().strftime('%Y-%m-%d')
+    df_asset = get_asset_top10_df(today)
+    print(df_asset[['name', 'symbol', 'market_cap', 'market_cap_num']])
 
-        df_asset['short_name'] = df_asset['name'].apply(
-            lambda x: x.strip().split()[-1] if isinstance(x, str) and x.strip() else x
-        )
-        df_asset['market_cap_zh'] = df_asset['symbol'].apply(symbol_to_zh_t)
-        # ----------------------------------
+    # 顯示欄位（價格、簡稱、x.x兆）整欄轉換
+    df_asset = add_asset_display_columns(df_asset)
+    # ----------------------------------
 
-        # 3. 排序、畫圖
-        df_sorted = df_asset.sort_values('market_cap_num', ascending=False).reset_index(drop=True)
-        img_asset = upload_to_r2(
-            plot_asset_top10_bar_chart(
-                df_sorted,
-                today,
-                unit_str="兆",
-                unit_div=1e12
-            )
-        )
-        market_cap_header = "市值"
-        # 4. Flex Bubble 組裝，這裡 asset_name 要用 name，market_cap_str 用 symbol
-        flex_asset = get_asset_competition_flex(today, df_sorted, img_asset, market_cap_header)
-        print("[DEBUG] flex_asset 完成")
-    except Exception as e:
-        print(f"[ERROR] flex_asset 失敗：{e}")
+    # 3. 排序、畫圖
+    df_sorted = df_asset.sort_values('market_cap_num', ascending=False).reset_index(drop=True)
+    img_asset = render_chart_url(
+        plot_asset_top10_bar_chart,
+        df_sorted,
+        today,
+        unit_str="兆",
+        unit_div=1e12
+    )
+    market_cap_header = "市值"
+    # 4. Flex Bubble 組裝，這裡 asset_name 要用 name，market_cap_str 用 symbol
+    return get_asset_competition_flex(today, df_sorted, img_asset, market_cap_header)
 
-    # BTC 六大類持幣
-    flex_btc_holder = safe_bubble(get_flex_bubble_btc_holder, days=14)
+def build_flex_carousel():
+    """產生 carousel，回傳 (carousel, complete)；complete 表示每組 bubble 都成功"""
+    print("========== 產生 Flex Carousel ==========")
+    # 四組 bubble 互相獨立，並行查詢資料；圖表由繪圖 process pool 同時繪製
+    # 單組失敗/逾時只會少該組 bubble，不中斷主流程
+    # 繪圖模組為延遲載入，開 thread 前先在主執行緒載入，避免多個 thread 同時 import matplotlib
+    import app.plot_chart, app.plot_chart_btc_holder  # noqa: F401
+    results = run_jobs({
+        "etf_btc": lambda: get_etf_bubbles("BTC"),
+        "etf_eth": lambda: get_etf_bubbles("ETH"),
+        "asset": get_flex_bubble_asset,
+        # BTC 六大類持幣
+        "btc_holder": lambda: get_flex_bubble_btc_holder(days=14),
+    }, max_workers=4, timeout=float(os.getenv("CAROUSEL_JOB_TIMEOUT", "300")), label="flex_carousel")
+    btc_bubble_14d, btc_bubble_hist = results["etf_btc"]["result"] or (None, None)
+    eth_bubble_14d, eth_bubble_hist = results["etf_eth"]["result"] or (None, None)
 
     # 組裝 carousel
     bubbles = [
@@ -265,17 +214,23 @@ def get_full_flex_carousel():
         btc_bubble_hist,
         eth_bubble_14d,
         eth_bubble_hist,
-        flex_asset,
-        flex_btc_holder,
+        results["asset"]["result"],
+        results["btc_holder"]["result"],
         # ...其它 future bubble
     ]
+    complete = all(r["status"] == "ok" for r in results.values()) and None not in bubbles
     bubbles = [b for b in bubbles if b is not None]
-    print(f"[INFO] 成功產生 {len(bubbles)} 張 bubble")
+    print(f"[INFO] 成功產生 {len(bubbles)} 張 bubble" + ("" if complete else "（部分失敗）"))
+    # 所有圖片並行確認 CDN 可用，避免推播時 LINE 取不到圖
+    wait_until_ready([b.get("hero", {}).get("url") for b in bubbles])
     carousel = {
         "type": "carousel",
         "contents": bubbles
     }
-    return carousel
+    return carousel, complete
+
+def get_full_flex_carousel():
+    return build_flex_carousel()[0]
 
 def get_plan_flex_bubble():
     return {
@@ -1,11 +1,16 @@
 import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
-from linebot import LineBotApi, WebhookHandler
+from fastapi import FastAPI, Request, HTTPException
+from linebot import WebhookParser
+from linebot.exceptions import InvalidSignatureError
 from linebot.models import MessageEvent, TextMessage, TextSendMessage, FlexSendMessage
 
 import app.fetcher.fetch_etf_daily as fetch_etf_daily
-from app.push.flex_utils import get_full_flex_carousel, get_plan_flex_bubble
+from app.push.flex_utils import get_plan_flex_bubble
+from app.carousel_store import get_daily_carousel
 from app.push.push_utils import push_flex_to_targets, push_text_to_targets
 from app.btc_holder_distribution import fetch_btc_holder_distribution
 from app.btc_holder_distribution_df import btc_holder_df_to_db
@@ -15,16 +20,26 @@ from app.fetcher.fetch_exchange_balance_history import fetch_and_save_exchange_b
 from app.fetcher.fetch_exchange_balance import fetch_and_save_exchange_balance
 from app.fetcher.fetch_funding_rate import fetch_and_save_funding_rate
 from app.fetcher.fetch_whale_alert import fetch_and_save_whale_alert
+from app import timeseries_store
+from app.etf_flow_stats import seed_etf_stats
+from app.push.admin_jobs import submit_admin_job
+from app.clients import get_line_bot_api
 
 app = FastAPI()
 load_dotenv()
 
-CHANNEL_ACCESS_TOKEN = os.getenv("LINE_CHANNEL_ACCESS_TOKEN")
 CHANNEL_SECRET = os.getenv("LINE_CHANNEL_SECRET")
 ADMIN_USER_ID = os.getenv("LINE_ADMIN_USER_ID")
+# webhook 事件處理（同步的 LINE API / Supabase 呼叫）在此 thread pool 執行，不佔用 event loop
+# 排隊中 + 執行中的 webhook 最多 WEBHOOK_MAX_PENDING 個，滿了回 503，不無限制堆積
+# 注意：LINE 只有在 Developers Console 開啟「Webhook redelivery」時才會重送 503 的事件，
+# 未開啟時這些事件即遺失，因此回 503 時逐一記錄被丟棄事件的 ID、來源與內容以便追查
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", "256"))
 
-line_bot_api = LineBotApi(CHANNEL_ACCESS_TOKEN)
-handler = WebhookHandler(CHANNEL_SECRET)
+parser = WebhookParser(CHANNEL_SECRET)
+_webhook_executor = ThreadPoolExecutor(max_workers=WEBHOOK_WORKERS, thread_name_prefix="webhook")
+_webhook_slots = threading.BoundedSemaphore(WEBHOOK_MAX_PENDING)
 
 SECRET_COMMANDS = {
     "更新ETF": "!update_data",
@@ -42,16 +57,46 @@ SECRET_COMMANDS = {
     "測試 Elite 推播": "!test_elite_push",
     # ✅ 新增白名單測試推播指令
     "白名單測試推播": "!test_whitelist_push",
+    "重建ETF快取": "!reload_etf_cache",
+    "重建推播快照": "!rebuild_carousel",
 }
 
 @app.post("/callback")
 async def callback(request: Request):
-    body = await request.body()
+    body = (await request.body()).decode()
     signature = request.headers.get("X-Line-Signature", "")
-    handler.handle(body.decode(), signature)
+    # 驗簽 + 解析在 loop 上完成（HMAC 與 JSON，很快），只驗一次；事件處理交給 thread pool
+    try:
+        events = parser.parse(body, signature)
+    except InvalidSignatureError:
+        raise HTTPException(status_code=400, detail="Invalid signature")
+    if not _webhook_slots.acquire(blocking=False):
+        print(f"[WARN] webhook 待處理已達上限 {WEBHOOK_MAX_PENDING}，回 503（{len(events)} 個事件）")
+        for event in events:
+            _log_dropped_event(event)
+        raise HTTPException(status_code=503, detail="Busy")
+    asyncio.get_running_loop().run_in_executor(_webhook_executor, _dispatch_events, events)
     return "OK"
 
-@handler.add(MessageEvent, message=TextMessage)
+def _log_dropped_event(event):
+    source = getattr(event, "source", None)
+    message = getattr(event, "message", None)
+    content = getattr(message, "text", None) or getattr(message, "type", None)
+    print(f"[WARN] 丟棄 webhook 事件 id={getattr(event, 'webhook_event_id', None)} "
+          f"type={getattr(event, 'type', None)} source={getattr(source, 'type', None)}:"
+          f"{getattr(source, 'user_id', None)} message={content}")
+
+def _dispatch_events(events):
+    try:
+        for event in events:
+            try:
+                if isinstance(event, MessageEvent) and isinstance(event.message, TextMessage):
+                    handle_message(event)
+            except Exception as e:
+                print(f"[ERROR] webhook 事件處理失敗: {e}")
+    finally:
+        _webhook_slots.release()
+
 def handle_message(event):
     user_id = event.source.user_id
     text = event.message.text.strip()
@@ -61,7 +106,7 @@ def handle_message(event):
     # 1. 所有人可用
     if text in ["/方案介紹", "方案介紹"]:
         flex_bubble = get_plan_flex_bubble()
-        line_bot_api.reply_message(
+        get_line_bot_api().reply_message(
             event.reply_token,
             FlexSendMessage("訂閱方案介紹", flex_bubble)
         )
@@ -70,46 +115,77 @@ def handle_message(event):
     # 2. 管理員秘密指令
     if text.startswith("!"):
         if user_id == ADMIN_USER_ID:
-            if text == SECRET_COMMANDS["補抓恐懼貪婪全歷史"]:
-                fetch_and_save_fear_greed(days=2000)
-                reply = "✅ 恐懼與貪婪指數全歷史已抓取！"
-            elif text == SECRET_COMMANDS["補抓交易所餘額全歷史"]:
-                fetch_and_save_exchange_balance_history()
-                reply = "✅ 交易所 BTC 餘額全歷史已抓取！"
-            elif text == SECRET_COMMANDS["補抓 FundingRate 全歷史"]:
-                fetch_and_save_funding_rate(days=2000)
-                reply = "✅ Funding Rate 全歷史已抓取！"
-            elif text == SECRET_COMMANDS["補抓 Whale Alert"]:
-                fetch_and_save_whale_alert()
-                reply = "✅ Whale Alert 最新24h已抓取！"
-            elif text == SECRET_COMMANDS["測試 Pro 推播"]:
-                from app.push.flex_utils import get_pro_plan_carousel
-                carousel = get_pro_plan_carousel()
-                push_flex_to_targets(carousel)
-                reply = "✅ Pro 方案推播已測試送出"
-            elif text == SECRET_COMMANDS["測試 Elite 推播"]:
-                from app.push.flex_utils import get_elite_carousels
-                carousels = get_elite_carousels()
-                for carousel in carousels:
-                    push_flex_to_targets(carousel)
-                reply = "✅ Elite 方案推播已測試送出"
-            elif text == SECRET_COMMANDS["測試推播"]:
-                carousel = get_full_flex_carousel()
-                push_flex_to_targets(carousel)
-                reply = "✅ 測試推播已送出"
-            elif text == SECRET_COMMANDS["更新ETF"]:
-                fetch_etf_daily.fetch_and_save("BTC", days=5)
-                fetch_etf_daily.fetch_and_save("ETH", days=5)
-                reply = "✅ ETF數據已同步（近五日）"
-            elif text == SECRET_COMMANDS["白名單測試推播"]:
-                push_text_to_targets("📢 白名單測試訊息")
-                reply = "✅ 已發送白名單測試訊息"
-            else:
-                reply = None
-
-            if reply:
-                line_bot_api.reply_message(event.reply_token, TextSendMessage(reply))
+            if text not in SECRET_COMMANDS.values():
+                return
+            if text not in ADMIN_ACTIONS:
+                get_line_bot_api().reply_message(event.reply_token, TextSendMessage(f"❓ 未知指令：{text}"))
+                return
+            # 背景執行，webhook 立即回覆；完成後再推播結果給管理員
+            accepted = submit_admin_job(
+                text,
+                lambda: run_admin_command(text),
+                notify=lambda msg: get_line_bot_api().push_message(user_id, TextSendMessage(msg)),
+            )
+            reply = f"⏳ 已受理 {text}，完成後通知" if accepted else f"⏳ {text} 執行中，完成後一併通知"
+            get_line_bot_api().reply_message(event.reply_token, TextSendMessage(reply))
             return
         else:
             # 非管理員 → 靜音
             return
+
+def _admin_fear_greed():
+    fetch_and_save_fear_greed(days=2000)
+    return "✅ 恐懼與貪婪指數全歷史已抓取！"
+
+def _admin_exchange_balance_history():
+    fetch_and_save_exchange_balance_history()
+    return "✅ 交易所 BTC 餘額全歷史已抓取！"
+
+def _admin_funding_rate():
+    fetch_and_save_funding_rate(days=2000)
+    return "✅ Funding Rate 全歷史已抓取！"
+
+def _admin_whale_alert():
+    fetch_and_save_whale_alert()
+    return "✅ Whale Alert 最新24h已抓取！"
+
+def _admin_test_push():
+    push_flex_to_targets(get_daily_carousel())
+    return "✅ 測試推播已送出"
+
+def _admin_rebuild_carousel():
+    carousel = get_daily_carousel(force=True)
+    return f"✅ carousel 快照已重建（{len(carousel.get('contents', []))} 張 bubble）"
+
+def _admin_update_etf():
+    fetch_etf_daily.fetch_and_save("BTC", days=5)
+    fetch_etf_daily.fetch_and_save("ETH", days=5)
+    return "✅ ETF數據已同步（近五日）"
+
+def _admin_test_whitelist_push():
+    push_text_to_targets("📢 白名單測試訊息")
+    return "✅ 已發送白名單測試訊息"
+
+def _admin_reload_etf_cache():
+    timeseries_store.invalidate("etf_flows")
+    for asset in ["BTC", "ETH"]:
+        seed_etf_stats(asset)
+    return "✅ ETF 本地快取已清除（下次推播將全量重載），歷史彙總已重建"
+
+# 實際有實作的管理指令；SECRET_COMMANDS 中其餘指令（尚未實作）回覆「未知指令」，不進背景工作
+ADMIN_ACTIONS = {
+    SECRET_COMMANDS["補抓恐懼貪婪全歷史"]: _admin_fear_greed,
+    SECRET_COMMANDS["補抓交易所餘額全歷史"]: _admin_exchange_balance_history,
+    SECRET_COMMANDS["補抓 FundingRate 全歷史"]: _admin_funding_rate,
+    SECRET_COMMANDS["補抓 Whale Alert"]: _admin_whale_alert,
+    SECRET_COMMANDS["測試推播"]: _admin_test_push,
+    SECRET_COMMANDS["重建推播快照"]: _admin_rebuild_carousel,
+    SECRET_COMMANDS["更新ETF"]: _admin_update_etf,
+    SECRET_COMMANDS["白名單測試推播"]: _admin_test_whitelist_push,
+    SECRET_COMMANDS["重建ETF快取"]: _admin_reload_etf_cache,
+}
+
+def run_admin_command(text):
+    """執行管理員秘密指令，回傳完成訊息（未實作的指令回傳 None）"""
+    action = ADMIN_ACTIONS.get(text)
+    return action() if action else None
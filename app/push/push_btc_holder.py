@@ -1,12 +1,12 @@
+import datetime
 import pandas as pd
-from app.db import query_btc_holder_distribution
-from app.plot_chart_btc_holder import plot_btc_holder_pie
-from app.push.push_etf_chart import upload_to_r2
+from app import timeseries_store
+from app.render_cache import render_chart_url
 from app.utils import BTC_HOLDER_COLOR_MAP
 
 def get_flex_bubble_btc_holder(days=7):
-    df_hist = query_btc_holder_distribution(days=days)
-    df_hist['date'] = pd.to_datetime(df_hist['date'])
+    start = datetime.date.today() - datetime.timedelta(days=days - 1)
+    df_hist = timeseries_store.get_range("btc_holder_distribution", start=start)
     unique_dates = sorted(df_hist['date'].unique())
     print("unique_dates:", unique_dates)
     print("df_hist shape:", df_hist.shape)
@@ -90,7 +90,8 @@ def get_flex_bubble_btc_holder(days=7):
                 })
 
     date_str = pd.to_datetime(today).strftime("%Y-%m-%d")
-    img_pie = upload_to_r2(plot_btc_holder_pie(df_today, date_str))
+    from app.plot_chart_btc_holder import plot_btc_holder_pie
+    img_pie = render_chart_url(plot_btc_holder_pie, df_today, date_str)
 
     bubble = {
         "type": "bubble",
@@ -1,60 +1,105 @@
 import os
 import uuid
 import time
-import boto3
-from botocore.client import Config
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
 from dotenv import load_dotenv
+from app.clients import get_r2
 
 # 自動載入 .env
 load_dotenv()
 
-def upload_to_r2(local_path, object_name=None):
+# CDN 一致性已知良好時可設 CF_R2_READY_CHECK=0 關閉上傳後的可用性檢查
+R2_READY_CHECK = os.getenv("CF_R2_READY_CHECK", "1") != "0"
+
+_http = requests.Session()
+
+def _r2_config():
+    return {
+        "bucket": os.getenv('CF_R2_BUCKET_NAME'),
+        "endpoint": os.getenv('CF_R2_ENDPOINT'),
+        "access_key": os.getenv('CF_R2_ACCESS_KEY'),
+        "secret_key": os.getenv('CF_R2_SECRET_KEY'),
+        # 你必須填自己的公開開發 URL，例如：
+        # CF_R2_CDN_DOMAIN=https://pub-fa63e55cc28d46829201c2420a86a4a4.r2.dev
+        "cdn_domain": os.getenv('CF_R2_CDN_DOMAIN'),
+    }
+
+def r2_public_url(object_name):
+    """物件的公開網址（優先使用 CDN 公開開發 URL）"""
+    cfg = _r2_config()
+    if cfg["cdn_domain"]:
+        return f"{cfg['cdn_domain']}/{object_name}"
+    # 萬一沒設，仍用原 endpoint，但建議強制用公開 URL
+    return f"{cfg['endpoint']}/{cfg['bucket']}/{object_name}"
+
+def r2_object_exists(object_name):
+    from botocore.exceptions import ClientError
+
+    cfg = _r2_config()
+    try:
+        get_r2().head_object(Bucket=cfg["bucket"], Key=object_name)
+        return True
+    except ClientError:
+        return False
+
+def wait_until_ready(urls, retries=10, interval=0.5):
     """
-    上傳本地圖片到 Cloudflare R2，回傳 CDN 圖片公開開發網址
+    並行檢查多張圖片的公開網址是否可取得（每張最多重試 retries 次，每次間隔 interval 秒），
+    總等待時間約為最慢的一張。回傳 {url: bool}；R2_READY_CHECK 關閉時直接略過。
+    """
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not R2_READY_CHECK or not urls:
+        return {u: True for u in urls}
+
+    def _check(url):
+        for _ in range(retries):
+            try:
+                if _http.head(url, timeout=5).status_code == 200:
+                    return True
+            except requests.RequestException:
+                pass
+            time.sleep(interval)
+        return False
+
+    with ThreadPoolExecutor(max_workers=min(16, len(urls))) as executor:
+        ready = dict(zip(urls, executor.map(_check, urls)))
+    not_ready = [u for u, ok in ready.items() if not ok]
+    if not_ready:
+        print(f"[WARN] {len(not_ready)} 張圖片尚未可用：{not_ready}")
+    return ready
+
+def upload_to_r2(image, object_name=None, wait_ready=True):
+    """
+    上傳圖片到 Cloudflare R2，回傳 CDN 圖片公開開發網址
+    image: PNG bytes / BytesIO（以 put_object 直接從記憶體上傳），或本地檔案路徑
+    wait_ready: 上傳後是否等待公開網址可用；批次上傳時傳 False，改由 wait_until_ready 一次並行檢查
     """
     # 1. 讀取環境變數
-    bucket = os.getenv('CF_R2_BUCKET_NAME')
-    endpoint = os.getenv('CF_R2_ENDPOINT')
-    access_key = os.getenv('CF_R2_ACCESS_KEY')
-    secret_key = os.getenv('CF_R2_SECRET_KEY')
-    # 你必須填自己的公開開發 URL，例如：
-    # CF_R2_CDN_DOMAIN=https://pub-fa63e55cc28d46829201c2420a86a4a4.r2.dev
-    cdn_domain = os.getenv('CF_R2_CDN_DOMAIN')  
+    cfg = _r2_config()
 
     # 2. 檔案唯一命名（避免 cache 問題）
     if object_name is None:
-        ext = local_path.split('.')[-1]
+        ext = image.split('.')[-1] if isinstance(image, str) else 'png'
         object_name = f"{int(time.time())}_{uuid.uuid4().hex}.{ext}"
 
     # 3. 建立 S3/R2 客戶端
-    s3 = boto3.client(
-        's3',
-        endpoint_url=endpoint,
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
-        config=Config(signature_version='s3v4')
-    )
+    s3 = get_r2()
 
     # 4. 上傳
-    s3.upload_file(local_path, bucket, object_name, ExtraArgs={'ACL': 'public-read', 'ContentType': 'image/png'})
+    if isinstance(image, str):
+        s3.upload_file(image, cfg["bucket"], object_name, ExtraArgs={'ACL': 'public-read', 'ContentType': 'image/png'})
+    else:
+        s3.put_object(Bucket=cfg["bucket"], Key=object_name, Body=image,
+                      ACL='public-read', ContentType='image/png')
 
     # 5. 強制使用公開開發 URL
-    if cdn_domain:
-        img_url = f"{cdn_domain}/{object_name}"
-    else:
-        # 萬一沒設，仍用原 endpoint，但建議強制用公開 URL
-        img_url = f"{endpoint}/{bucket}/{object_name}"
+    img_url = r2_public_url(object_name)
 
     # 6. 等待圖片可用（最多重試10次，每0.5秒）
-    import requests
-    for _ in range(10):
-        try:
-            resp = requests.get(img_url, timeout=5)
-            if resp.status_code == 200:
-                break
-        except Exception:
-            pass
-        time.sleep(0.5)
+    if wait_ready:
+        wait_until_ready([img_url])
 
     # 7. debug log
     print(f"[DEBUG] 已上傳至 R2，圖片公開網址：{img_url}")
@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+from app.utils import cache_path
+from concurrent.futures import ThreadPoolExecutor
+from app.push.push_etf_chart import upload_to_r2, r2_object_exists, r2_public_url
+from app.render_pool import render_png
+
+# 圖表樣式有變更時調高版本，讓舊快取全部失效
+RENDER_CACHE_VERSION = "1"
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE", "1") != "0"
+
+_lock = threading.Lock()
+
+def _index_file():
+    return cache_path("render", "index.json")
+
+def _read_index():
+    path = _index_file()
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _write_index(index):
+    path = _index_file()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _hash_value(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr(list(value.columns)).encode())
+        h.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+    else:
+        h.update(repr(value).encode())
+
+def chart_fingerprint(plot_func, *args, **kwargs):
+    """以繪圖函式、輸入資料內容與參數計算指紋；資料與參數不變則指紋不變"""
+    h = hashlib.sha256()
+    h.update(f"{RENDER_CACHE_VERSION}:{plot_func.__module__}.{plot_func.__name__}".encode())
+    for value in args:
+        _hash_value(h, value)
+    for key in sorted(kwargs):
+        h.update(key.encode())
+        _hash_value(h, kwargs[key])
+    return h.hexdigest()
+
+def render_chart_url(plot_func, *args, **kwargs):
+    """
+    繪圖並上傳 R2，回傳 CDN 網址（不等待 CDN 可用，由呼叫端以 wait_until_ready 批次檢查）；
+    以資料指紋為 key 快取：
+    1. 本地索引命中 → 直接回傳網址
+    2. R2 上已有同指紋物件（例如其他程序畫過）→ 回傳網址
+    3. 都沒有才交給繪圖 process pool 繪圖，並將 PNG bytes 上傳
+    """
+    key = chart_fingerprint(plot_func, *args, **kwargs)
+    object_name = f"charts/{plot_func.__name__}/{key[:32]}.png"
+    if RENDER_CACHE_ENABLED:
+        with _lock:
+            url = _read_index().get(key)
+        if url:
+            print(f"[LOG] 圖表快取命中：{plot_func.__name__} → {url}")
+            return url
+        if r2_object_exists(object_name):
+            url = r2_public_url(object_name)
+            print(f"[LOG] 圖表已存在於 R2：{plot_func.__name__} → {url}")
+        else:
+            url = upload_to_r2(render_png(plot_func, *args, **kwargs), object_name=object_name, wait_ready=False)
+        with _lock:
+            index = _read_index()
+            index[key] = url
+            _write_index(index)
+        return url
+    return upload_to_r2(render_png(plot_func, *args, **kwargs), wait_ready=False)
+
+def render_chart_urls(jobs):
+    """
+    並行產生多張圖表：jobs = {name: (plot_func, args, kwargs)}，回傳 {name: url}。
+    各圖同時送進繪圖 process pool，總耗時約為最慢的一張。
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as executor:
+        futures = {name: executor.submit(render_chart_url, func, *args, **kwargs)
+                   for name, (func, args, kwargs) in jobs.items()}
+        return {name: fut.result() for name, fut in futures.items()}
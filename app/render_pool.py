@@ -0,0 +1,56 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# matplotlib 為 CPU-bound 且持有 GIL，改在獨立 process 繪圖；RENDER_WORKERS=0 則在本程序繪圖
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
+# pyplot 非 thread-safe，本程序繪圖時需序列化
+_local_render_lock = threading.Lock()
+
+def _init_worker():
+    """worker 啟動時預先載入 matplotlib 與 NotoSansTC 字型，避免第一張圖負擔冷啟動"""
+    from app.plot_chart import ensure_font
+    import app.plot_chart_btc_holder  # noqa: F401
+    ensure_font()
+
+def _noop():
+    # 稍作停留，讓 pool 必須啟動多個 worker 才能消化所有暖機工作
+    time.sleep(0.2)
+    return os.getpid()
+
+def _render_png(plot_func, args, kwargs):
+    return plot_func(*args, **kwargs).getvalue()
+
+def get_render_pool():
+    global _pool
+    if RENDER_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+def warm_render_pool():
+    """先把所有 worker 啟動（含字型載入），建議在程序啟動時呼叫"""
+    pool = get_render_pool()
+    if pool is None:
+        return
+    pids = set(f.result() for f in [pool.submit(_noop) for _ in range(RENDER_WORKERS)])
+    print(f"[LOG] 繪圖 process pool 已就緒：{len(pids)} 個 worker")
+
+def render_png(plot_func, *args, **kwargs):
+    """呼叫 plot_func 繪圖並回傳 PNG bytes（優先在 process pool 執行）"""
+    pool = get_render_pool()
+    if pool is None:
+        with _local_render_lock:
+            return _render_png(plot_func, args, kwargs)
+    return pool.submit(_render_png, plot_func, args, kwargs).result()
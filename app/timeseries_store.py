@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from app.utils import cache_path
+from app.carousel_store import last_ingested
+from app.pipeline.schema import SCHEMAS, apply_schema, memory_bytes
+
+# 各指標表的本地時序儲存：每張表一份依日期排序的欄式 DataFrame（記憶體 + Parquet 落地），
+# bubble / 圖表一律由此讀取，不各自查 Supabase
+# - 增量同步：只拉「本地最高日期 - 重疊天數」之後的資料並覆蓋該區段（近期資料可能被重新 upsert 修正）
+# - 有新資料寫入（mark_data_ingested）或超過 TS_STORE_SYNC_TTL 秒才再同步，其餘直接讀記憶體
+# - 欄位型別（category / int32、比率欄 float32）見 pipeline.schema，全量重載時印出整理前後記憶體
+# - invalidate() 寫入失效標記，其他程序讀取時比對標記時間，下次同步即全量重載
+# - 每張表各自一把鎖：同步（含 Supabase 分頁查詢）只擋同一張表，不同表可並行同步
+TS_STORE_OVERLAP_DAYS = int(os.getenv("TS_STORE_OVERLAP_DAYS", "7"))
+TS_STORE_SYNC_TTL = float(os.getenv("TS_STORE_SYNC_TTL", "600"))
+
+_locks_guard = threading.Lock()
+_table_locks = defaultdict(threading.Lock)
+_frames = {}
+_synced_at = {}
+
+def _table_lock(table):
+    with _locks_guard:
+        return _table_locks[table]
+
+def _store_file(table):
+    return cache_path("timeseries", f"{table}.parquet")
+
+def _invalidated_file(table):
+    return cache_path("timeseries", f"{table}.invalidated")
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+def _read_store(table):
+    path = _store_file(table)
+    if not os.path.isfile(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"[WARN] {table} 本地時序檔讀取失敗，改為全量重載：{e}")
+        return None
+
+def _write_store(table, df):
+    path = _store_file(table)
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+def _coerce(df, table, report=False):
+    """套用 pipeline.schema 的欄位型別（date 解析、category、int32/float32），並依日期排序"""
+    df = apply_schema(df, table, report=report)
+    return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+def _is_fresh(table):
+    synced = _synced_at.get(table)
+    if synced is None or time.time() - synced > TS_STORE_SYNC_TTL:
+        return False
+    return synced >= last_ingested() and synced >= _mtime(_invalidated_file(table))
+
+def _sync(table):
+    from app.db import query_table_rows
+
+    if _mtime(_invalidated_file(table)) > _synced_at.get(table, 0.0):
+        _frames.pop(table, None)
+    cached = _frames.get(table)
+    if cached is None:
+        cached = _read_store(table)
+    synced_at = time.time()
+
+    if cached is None or cached.empty:
+        df = query_table_rows(table)
+        print(f"[LOG] {table} 時序資料全量重載：{len(df)} 筆")
+        if not df.empty:
+            df = _coerce(df, table, report=True)
+    else:
+        since = cached["date"].max() - pd.Timedelta(days=TS_STORE_OVERLAP_DAYS)
+        delta = query_table_rows(table, since=since)
+        if delta.empty:
+            df = cached
+        else:
+            # 兩段的 category 值不同，合併後重新整理型別
+            df = pd.concat([cached[cached["date"] < since], _coerce(delta, table)], ignore_index=True)
+            df = _coerce(df, table)
+        print(f"[LOG] {table} 時序資料增量同步：自 {since.date()} 起 {len(delta)} 筆，共 {len(df)} 筆")
+
+    if not df.empty and df is not cached:
+        _write_store(table, df)
+    _frames[table] = df
+    _synced_at[table] = synced_at
+    return df
+
+def load(table):
+    """整張表（依日期排序、型別已整理）；需要時先增量同步。回傳的 DataFrame 與其他呼叫端共用，請勿原地修改"""
+    with _table_lock(table):
+        if _is_fresh(table):
+            return _frames[table]
+        return _sync(table)
+
+def sync(table=None):
+    """強制增量同步（table=None 代表 SCHEMAS 全部），回傳各表筆數"""
+    tables = [table] if table else list(SCHEMAS)
+    counts = {}
+    for name in tables:
+        with _table_lock(name):
+            counts[name] = len(_sync(name))
+    return counts
+
+def get_range(table, start=None, end=None, **eq):
+    """
+    取 start <= date <= end（含端點，None 代表不限）的資料，eq 為等值篩選（例如 asset="BTC"）。
+    日期區間以二分搜尋切片；回傳獨立複本，未用到的 category 值已移除。
+    """
+    df = load(table)
+    if df.empty:
+        return df.copy()
+    dates = df["date"].to_numpy()
+    lo = 0 if start is None else np.searchsorted(dates, pd.Timestamp(start).to_datetime64(), side="left")
+    hi = len(df) if end is None else np.searchsorted(dates, pd.Timestamp(end).to_datetime64(), side="right")
+    part = df.iloc[lo:hi]
+    for col, value in eq.items():
+        part = part[part[col] == value]
+    part = part.reset_index(drop=True).copy()
+    for col in part.select_dtypes("category"):
+        part[col] = part[col].cat.remove_unused_categories()
+    return part
+
+def latest_date(table, **eq):
+    """最新資料日期（無資料為 None）"""
+    df = get_range(table, **eq) if eq else load(table)
+    return None if df.empty else df["date"].max()
+
+def memory_usage():
+    """目前記憶體中各表的筆數與佔用（bytes），追蹤歷史增長用"""
+    frames = dict(_frames)
+    return {name: {"rows": len(df), "bytes": memory_bytes(df)} for name, df in frames.items()}
+
+def invalidate(table=None):
+    """清除本地時序資料（table=None 代表全部），下次讀取時全量重載"""
+    tables = [table] if table else list(SCHEMAS)
+    for name in tables:
+        with _table_lock(name):
+            _frames.pop(name, None)
+            _synced_at.pop(name, None)
+            with open(_invalidated_file(name), "w") as f:
+                f.write(str(time.time()))
+            path = _store_file(name)
+            if os.path.isfile(path):
+                os.remove(path)
+                print(f"[LOG] 已清除 {name} 本地時序資料")
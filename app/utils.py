@@ -1,7 +1,17 @@
+import os
 import pandas as pd
 import datetime
 import pytz
 
+# 本地快取根目錄（Parquet/JSON 等），可用 FIN_CACHE_DIR 覆寫
+CACHE_DIR = os.getenv("FIN_CACHE_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.cache')))
+
+def cache_path(*parts):
+    """回傳快取檔路徑，並確保所在目錄存在"""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
 def human_unit(val):
     if val is None or (isinstance(val, float) and pd.isna(val)):
         return "0"
@@ -42,7 +52,7 @@ def etf_flex_table(etf_summary):
 def etf_flex_table_single_day(df):
     df['flow_usd'] = pd.to_numeric(df['flow_usd'], errors='coerce').fillna(0)
     df_day = df[df['date'] == df['date'].max()]
-    etf_summary = df_day.groupby('etf_ticker')['flow_usd'].sum().sort_values(ascending=False)
+    etf_summary = df_day.groupby('etf_ticker', observed=True)['flow_usd'].sum().sort_values(ascending=False)
     rows = []
     for ticker, flow in etf_summary.items():
         color = "#FA5252" if flow < 0 else "#1D9BF6"
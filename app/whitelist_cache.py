@@ -0,0 +1,79 @@
+import os
+import time
+import datetime
+import threading
+import pandas as pd
+from app.utils import cache_path
+
+# 有效白名單快取：{user_id: access_until}
+# - 每筆依 access_until 在本地到期，不必等重載
+# - 超過 WHITELIST_CACHE_TTL 秒整份重載（兜底，處理未經本程式的資料庫異動）
+# - 白名單異動（internal_whitelist /upsert、/remove、db.upsert/remove_bot_whitelist）呼叫 invalidate_whitelist，
+#   寫入異動標記；排程/API 若為不同程序，讀取時比對標記時間即可立即失效
+WHITELIST_CACHE_TTL = float(os.getenv("WHITELIST_CACHE_TTL", "300"))
+
+_lock = threading.Lock()
+_entries = {}
+_loaded_at = 0.0
+
+def _changed_file():
+    return cache_path("whitelist", "changed_at")
+
+def _last_changed():
+    try:
+        return os.path.getmtime(_changed_file())
+    except OSError:
+        return 0.0
+
+def invalidate_whitelist():
+    """白名單有異動時呼叫，下次讀取即重載"""
+    global _loaded_at
+    with _lock:
+        _loaded_at = 0.0
+    path = _changed_file()
+    with open(path, "w") as f:
+        f.write(str(time.time()))
+
+def _to_epoch(access_until):
+    # 無時區的字串視為 UTC（與 query 時的 utcnow 比較一致）
+    return pd.Timestamp(access_until).timestamp()
+
+def _entries_fresh():
+    now = time.time()
+    if now - _loaded_at > WHITELIST_CACHE_TTL or _last_changed() >= _loaded_at:
+        return None
+    return _entries
+
+def _load():
+    global _entries, _loaded_at
+    from app.db import query_active_whitelist_entries
+
+    with _lock:
+        if _entries_fresh() is not None:
+            return _entries
+        loaded_at = time.time()
+        rows = query_active_whitelist_entries()
+        _entries = {uid: _to_epoch(until) for uid, until in rows.items() if until}
+        _loaded_at = loaded_at
+        print(f"[LOG] 白名單快取已載入：{len(_entries)} 人")
+        return _entries
+
+def _current():
+    entries = _entries_fresh()
+    return entries if entries is not None else _load()
+
+def get_active_whitelist():
+    """目前有效的白名單 user_id（記憶體查詢，過期者即時排除）"""
+    now = time.time()
+    return [uid for uid, until in _current().items() if until >= now]
+
+def is_whitelisted(user_id):
+    until = _current().get(user_id)
+    return until is not None and until >= time.time()
+
+def get_access_until(user_id):
+    """有效用戶回傳 access_until（UTC datetime），否則 None"""
+    until = _current().get(user_id)
+    if until is None or until < time.time():
+        return None
+    return datetime.datetime.utcfromtimestamp(until)
@@ -0,0 +1,141 @@
+"""
+資產排行頁解析壓測：BeautifulSoup(html.parser) 全文解析 vs lxml 增量解析（讀滿前 10 列即停）。
+用法：python bench_asset_ranking.py [--fixture saved_page.html] [--rows 500] [--repeat 20]
+未指定 --fixture 時以合成頁面（結構同 companiesmarketcap 資產排行頁）測試；
+另以本機 HTTP 伺服器量測條件式 GET（200 全頁 vs 304 未變更）。
+"""
+import os
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_fixture(n_rows=500, seed=3):
+    rng = random.Random(seed)
+    head = "".join(f"<style>.c{i}{{color:#{i:06x};margin:{i % 7}px}}</style>" for i in range(300))
+    script = "<script>var cfg = {" + ",".join(f'"k{i}": {i}' for i in range(3000)) + "};</script>"
+    rows = []
+    for i in range(n_rows):
+        cap = 20.0 / (i + 1) ** 0.8
+        unit, cap = ("T", cap) if cap >= 1 else ("B", cap * 1000)
+        rows.append(
+            f'<tr><td class="rank-td" data-sort="{i + 1}">{i + 1}</td>'
+            f'<td class="name-td"><div class="logo-container"><img class="company-logo" loading="lazy" '
+            f'src="/img/company-logos/64/A{i}.webp"></div><div class="name-div"><div class="company-name">Asset {i}</div>'
+            f'<div class="company-code">A{i}</div></div></td>'
+            f'<td class="td-right" data-sort="{int(cap * 1e9)}">${cap:.3f} {unit}</td>'
+            f'<td class="td-right">${rng.uniform(1, 1e5):,.2f}</td>'
+            f'<td class="rh-sm"><span class="percentage-green">{rng.uniform(0, 5):.2f}%</span></td>'
+            f'<td><svg width="100" height="30"><path d="M0 {rng.randint(0, 30)} L100 {rng.randint(0, 30)}"/></svg></td>'
+            f'<td><span class="responsive-hidden">Country {i % 40}</span></td></tr>'
+        )
+    footer = "<footer>" + "<p>lorem ipsum dolor sit amet</p>" * 2000 + "</footer>"
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Assets</title>{head}{script}</head>'
+            f'<body><nav><ul>{"<li><a href=#>menu</a></li>" * 200}</ul></nav>'
+            f'<table class="default-table table marketcap-table"><thead><tr><th>Rank</th><th>Name</th>'
+            f'<th>Market Cap</th><th>Price</th><th>Today</th><th>Price (30 days)</th><th>Country</th></tr></thead>'
+            f'<tbody>{"".join(rows)}</tbody></table>{footer}</body></html>').encode("utf-8")
+
+def parse_bs4(html):
+    """舊寫法：整份文件交給 BeautifulSoup 的純 Python html.parser"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html.decode("utf-8"), "html.parser")
+    result = []
+    for item in soup.select("table tbody tr")[:10]:
+        cols = item.find_all("td")
+        result.append({
+            "rank": int(cols[0].text.strip()),
+            "name": cols[1].text.strip(),
+            "symbol": cols[2].text.strip(),
+            "market_cap": cols[3].text.strip(),
+            "logo": cols[1].find("img")['src'] if cols[1].find("img") else None,
+        })
+    return result
+
+def _best(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+class _FixtureServer(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive，量測 Session 連線重用
+    body = b""
+    etag = ""
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+def bench_conditional_get(html, repeat):
+    import app.fetcher.asset_ranking as asset_ranking
+
+    _FixtureServer.body = html
+    _FixtureServer.etag = '"' + hashlib.md5(html).hexdigest() + '"'
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    asset_ranking.URL = f"http://127.0.0.1:{server.server_address[1]}/assets-by-market-cap/"
+    try:
+        cache = asset_ranking._cache_file()
+        full = []
+        for _ in range(repeat):
+            if os.path.exists(cache):
+                os.remove(cache)
+            t0 = time.perf_counter()
+            asset_ranking.fetch_global_asset_top10()
+            full.append(time.perf_counter() - t0)
+        cond, rows = _best(asset_ranking.fetch_global_asset_top10, repeat)
+    finally:
+        server.shutdown()
+    return min(full), cond, rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", help="已存檔的資產排行頁 HTML")
+    parser.add_argument("--rows", type=int, default=500, help="合成頁面的列數")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("FIN_CACHE_DIR", tempfile.mkdtemp(prefix="bench_asset_ranking_"))
+    from app.fetcher.asset_ranking import parse_asset_top10
+
+    if args.fixture:
+        with open(args.fixture, "rb") as f:
+            html = f.read()
+    else:
+        html = make_fixture(args.rows)
+
+    t_bs4, rows_bs4 = _best(lambda: parse_bs4(html), args.repeat)
+    t_lxml, rows_lxml = _best(lambda: parse_asset_top10([html[i:i + 16384] for i in range(0, len(html), 16384)]),
+                              args.repeat)
+    assert rows_bs4 == rows_lxml, "兩種解析結果不一致"
+    print(f"[RESULT] page={len(html) / 1024:.0f}KB rows={len(rows_lxml)} repeat={args.repeat}")
+    print(f"  bs4 html.parser (full)   : {t_bs4 * 1000:8.2f}ms")
+    print(f"  lxml incremental (top10) : {t_lxml * 1000:8.2f}ms  x{t_bs4 / t_lxml:.0f}")
+
+    t_full, t_cond, rows = bench_conditional_get(html, min(args.repeat, 5))
+    assert rows == rows_lxml
+    print(f"  GET 200 + parse (local)  : {t_full * 1000:8.2f}ms")
+    print(f"  GET 304 not modified     : {t_cond * 1000:8.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+JSON → DataFrame 解析壓測：以合成的 2000 日 Coinglass payload 比較逐筆迴圈（舊寫法）與整欄轉換（pipeline.processor）。
+用法：python bench_parsers.py [--days 2000] [--etfs 12] [--exchanges 30] [--repeat 5]
+每個解析器先核對兩種寫法輸出一致，再回報各自的最佳耗時與加速倍數。
+"""
+import time
+import random
+import argparse
+import datetime
+import pandas as pd
+from app.pipeline.processor import (
+    process_etf_flows_json, exchange_balance_history_to_df, fear_greed_to_df, funding_rate_to_df,
+)
+
+DAY_MS = 86_400_000
+START_MS = 1_546_300_800_000  # 2019-01-01 UTC
+
+# ---------- 舊寫法（逐筆），僅供對照 ----------
+def legacy_etf_flows(json_data, symbol):
+    flows = []
+    for day in json_data['data']:
+        date = datetime.datetime.fromtimestamp(day['timestamp']//1000).strftime('%Y-%m-%d')
+        total = day.get('flow_usd', day.get('change_usd', 0))
+        etf_flows = day.get('etf_flows') or day.get('etf_flow') or day.get('etf_flows', [])
+        for etf in etf_flows:
+            flows.append({
+                "date": date,
+                "asset": symbol,
+                "etf_ticker": etf['etf_ticker'] if 'etf_ticker' in etf else etf.get('ticker', ''),
+                "flow_usd": etf['flow_usd'] if 'flow_usd' in etf else etf.get('change_usd', 0),
+                "total_flow_usd": total,
+                "price_usd": day.get('price_usd') or day.get('price') or None
+            })
+    return pd.DataFrame(flows)
+
+def legacy_exchange_balance(time_list, data_map):
+    records = []
+    for exch, balance_list in data_map.items():
+        for idx, bal in enumerate(balance_list):
+            if bal is None:
+                continue
+            records.append({
+                "date": pd.to_datetime(time_list[idx], unit='ms').strftime('%Y-%m-%d'),
+                "exchange": exch,
+                "btc_balance": float(bal),
+            })
+    return pd.DataFrame(records)
+
+def legacy_fear_greed(data_list, time_list):
+    return pd.DataFrame([{"date": pd.to_datetime(ts, unit="ms").strftime('%Y-%m-%d'), "score": int(score)}
+                         for score, ts in zip(data_list, time_list)])
+
+def legacy_funding_rate(rows, exchange, symbol):
+    return pd.DataFrame([{
+        "date": pd.to_datetime(row["time"], unit="ms").strftime("%Y-%m-%d"),
+        "exchange": exchange, "symbol": symbol,
+        "open": float(row["open"]), "high": float(row["high"]),
+        "low": float(row["low"]), "close": float(row["close"]),
+    } for row in rows])
+
+# ---------- 合成 payload ----------
+def make_payloads(days, n_etfs, n_exchanges, seed=42):
+    rng = random.Random(seed)
+    times = [START_MS + i * DAY_MS for i in range(days)]
+    tickers = [f"ETF{j:02d}" for j in range(n_etfs)]
+    etf_days = []
+    for i, ts in enumerate(times):
+        listed = tickers[: max(1, int(n_etfs * min(1.0, (i + 1) / (days / 2))))]
+        etf_days.append({
+            "timestamp": ts,
+            "flow_usd": rng.uniform(-5e8, 5e8),
+            "price_usd": rng.uniform(1e4, 1e5),
+            "etf_flows": [{"etf_ticker": t, "flow_usd": rng.choice([0.0, rng.uniform(-1e8, 1e8)])} for t in listed],
+        })
+    data_map = {f"EX{k:02d}": [None if rng.random() < 0.05 else rng.uniform(1e3, 5e5) for _ in times]
+                for k in range(n_exchanges)}
+    fear_greed = ([rng.randint(5, 95) for _ in times], times)
+    funding = [{"time": ts, **{c: rng.uniform(-0.01, 0.01) for c in ("open", "high", "low", "close")}}
+               for ts in times]
+    return {"etf": {"data": etf_days}, "balance": (times, data_map), "fear_greed": fear_greed, "funding": funding}
+
+def _best(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2000)
+    parser.add_argument("--etfs", type=int, default=12)
+    parser.add_argument("--exchanges", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    p = make_payloads(args.days, args.etfs, args.exchanges)
+    cases = {
+        "etf_flows": (lambda: legacy_etf_flows(p["etf"], "BTC"),
+                      lambda: process_etf_flows_json(p["etf"], "BTC")),
+        "exchange_balance_history": (lambda: legacy_exchange_balance(*p["balance"]),
+                                     lambda: exchange_balance_history_to_df(*p["balance"])),
+        "fear_greed": (lambda: legacy_fear_greed(*p["fear_greed"]),
+                       lambda: fear_greed_to_df(*p["fear_greed"])),
+        "funding_rate": (lambda: legacy_funding_rate(p["funding"], "Binance", "BTCUSDT"),
+                         lambda: funding_rate_to_df(p["funding"], "Binance", "BTCUSDT")),
+    }
+    print(f"[RESULT] days={args.days} etfs={args.etfs} exchanges={args.exchanges} repeat={args.repeat}")
+    for name, (legacy, vectorized) in cases.items():
+        t_old, df_old = _best(legacy, args.repeat)
+        t_new, df_new = _best(vectorized, args.repeat)
+        pd.testing.assert_frame_equal(df_old.reset_index(drop=True), df_new.reset_index(drop=True), check_dtype=False)
+        print(f"  {name:<26} rows={len(df_new):>7}  loop={t_old * 1000:8.1f}ms  "
+              f"vectorized={t_new * 1000:7.1f}ms  x{t_old / t_new:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+欄位型別整理前後的記憶體：以合成的全交易所 BTC 餘額歷史、ETF flow、巨鯨異動、資金費率，比較原始 JSON 讀入的 DataFrame 與 pipeline.schema.apply_schema 之後。
+用法：python bench_schema.py [--days 2000] [--exchanges 30] [--etfs 12] [--whales 20000]
+每張表回報筆數、整理前後記憶體、縮減比例與 float32（比率欄）最大相對誤差；金額欄維持 float64，另核對與原值完全相同。
+"""
+import time
+import random
+import argparse
+import numpy as np
+import pandas as pd
+from app.pipeline.schema import SCHEMAS, apply_schema, memory_bytes
+
+def make_rows(days, n_exchanges, n_etfs, n_whales, seed=7):
+    """模擬 Supabase 回傳的 JSON rows（日期為字串、數值為 float）"""
+    rng = random.Random(seed)
+    dates = pd.date_range(end="2026-10-16", periods=days).strftime("%Y-%m-%d").tolist()
+    balance = [{"date": d, "exchange": f"Exchange {k:02d}", "btc_balance": rng.uniform(1e3, 5e5)}
+               for k in range(n_exchanges) for d in dates]
+    etf = [{"date": d, "asset": asset, "etf_ticker": f"{asset}{j:02d}", "flow_usd": rng.uniform(-1e8, 1e8),
+            "total_flow_usd": rng.uniform(-5e8, 5e8), "price_usd": rng.uniform(1e3, 1e5)}
+           for asset in ("BTC", "ETH") for d in dates for j in range(n_etfs)]
+    whale = [{"date": rng.choice(dates), "symbol": rng.choice(["BTC", "ETH", "SOL", "XRP"]),
+              "user_address": f"0x{rng.getrandbits(160):040x}", "position_size": rng.uniform(-1e4, 1e4),
+              "position_action": rng.choice([1, 2]), "position_value_usd": rng.uniform(1e6, 1e8),
+              "entry_price": rng.uniform(1, 1e5), "liq_price": rng.uniform(1, 1e5),
+              "tx_time": "2026-10-16 12:00:00"} for _ in range(n_whales)]
+    funding = [{"date": d, "exchange": f"Exchange {k:02d}", "symbol": "BTCUSDT",
+                **{c: rng.uniform(-0.01, 0.01) for c in ("open", "high", "low", "close")}}
+               for k in range(min(n_exchanges, 10)) for d in dates]
+    return {"exchange_btc_balance": balance, "etf_flows": etf, "whale_alert": whale, "funding_rate": funding}
+
+def assert_amounts_exact(raw, typed, schema):
+    for col in SCHEMAS[schema].get("float64", []):
+        assert typed[col].dtype == np.float64 and (typed[col].to_numpy() == raw[col].to_numpy()).all(), col
+
+def max_rel_error(raw, typed, schema):
+    worst = 0.0
+    for col in SCHEMAS[schema].get("float32", []):
+        if typed[col].dtype != np.float32:
+            continue
+        exact = raw[col].to_numpy(dtype="float64")
+        worst = max(worst, float(np.max(np.abs(typed[col].to_numpy(dtype="float64") - exact) / np.abs(exact))))
+    return worst
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2000)
+    parser.add_argument("--exchanges", type=int, default=30)
+    parser.add_argument("--etfs", type=int, default=12)
+    parser.add_argument("--whales", type=int, default=20000)
+    args = parser.parse_args()
+
+    tables = make_rows(args.days, args.exchanges, args.etfs, args.whales)
+    print(f"[RESULT] days={args.days} exchanges={args.exchanges} etfs={args.etfs} whales={args.whales}")
+    total_before = total_after = 0
+    for schema, rows in tables.items():
+        raw = pd.DataFrame(rows)
+        t0 = time.perf_counter()
+        typed = apply_schema(raw, schema)
+        elapsed = time.perf_counter() - t0
+        assert_amounts_exact(raw, typed, schema)
+        before, after = memory_bytes(raw), memory_bytes(typed)
+        total_before += before
+        total_after += after
+        print(f"  {schema:<22} rows={len(raw):>7}  {before / 1e6:8.2f}MB → {after / 1e6:7.2f}MB "
+              f"({after / before:4.0%})  float32 max rel err={max_rel_error(raw, typed, schema):.1e}  "
+              f"apply={elapsed * 1000:6.1f}ms")
+    print(f"  {'total':<22} {'':>12}  {total_before / 1e6:8.2f}MB → {total_after / 1e6:7.2f}MB "
+          f"({total_after / total_before:4.0%})")
+
+if __name__ == "__main__":
+    main()
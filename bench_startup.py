@@ -0,0 +1,50 @@
+"""
+啟動時間壓測：在全新 Python 程序中 import 各進入點，量測 import 耗時。
+用法：python bench_startup.py [--runs 5] [--top 10]
+回報每個進入點的 import 時間中位數/最小值，以及最重的頂層模組（-X importtime 累計值）。
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ENTRY_POINTS = ["scheduler", "app.push.line_command_handler"]
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def _import_seconds(module):
+    code = f"import time; t0 = time.perf_counter(); import {module}; print(time.perf_counter() - t0)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def _heaviest_imports(module, top):
+    """-X importtime 的直接子模組（第一層縮排）依累計時間排序"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  ") and not name.startswith("    "):
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    for module in ENTRY_POINTS:
+        samples = [_import_seconds(module) for _ in range(args.runs)]
+        print(f"[RESULT] import {module}: median={statistics.median(samples):.3f}s "
+              f"min={min(samples):.3f}s runs={args.runs}")
+        for seconds, name in _heaviest_imports(module, args.top):
+            print(f"  {seconds:7.3f}s  {name}")
+    print(f"[LOG] 總耗時 {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
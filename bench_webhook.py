@@ -0,0 +1,140 @@
+"""
+/callback webhook 壓測：本機 LINE API 替身 + 合成簽章事件。
+用法：python bench_webhook.py [--events 2000] [--concurrency 50] [--api-delay 0.05]
+回報 webhook 回應的吞吐（events/s）與 p50/p99 延遲、待處理滿載回 503 的次數（WEBHOOK_MAX_PENDING），以及替身收到的 reply 數。
+"""
+import os
+import sys
+import json
+import time
+import hmac
+import base64
+import socket
+import hashlib
+import argparse
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class _FakeLineApi(BaseHTTPRequestHandler):
+    delay = 0.05
+    replies = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay)  # 模擬 LINE API 往返
+        with _FakeLineApi.lock:
+            _FakeLineApi.replies += 1
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _event_body(i):
+    return json.dumps({
+        "destination": "Ubench",
+        "events": [{
+            "type": "message",
+            "mode": "active",
+            "timestamp": int(time.time() * 1000),
+            "source": {"type": "user", "userId": f"Ubench{i:05d}"},
+            "webhookEventId": f"bench-{i}",
+            "deliveryContext": {"isRedelivery": False},
+            "replyToken": f"token-{i}",
+            "message": {"id": str(i), "type": "text", "quoteToken": f"q{i}", "text": "方案介紹"},
+        }],
+    })
+
+def _sign(secret, body):
+    digest = hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+async def _run_load(url, secret, n_events, concurrency):
+    import httpx
+
+    latencies = []
+    errors = 0
+    busy = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def one(i):
+            nonlocal errors, busy
+            body = _event_body(i)
+            headers = {"X-Line-Signature": _sign(secret, body), "Content-Type": "application/json"}
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await client.post(url, content=body, headers=headers)
+                latencies.append(time.perf_counter() - t0)
+                if resp.status_code == 503:
+                    busy += 1
+                elif resp.status_code != 200:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_events)))
+        elapsed = time.perf_counter() - t0
+    return latencies, errors, busy, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--api-delay", type=float, default=0.05, help="LINE API 替身每次回應延遲（秒）")
+    args = parser.parse_args()
+
+    api_port, app_port = _free_port(), _free_port()
+    secret = "bench-secret"
+    os.environ.update({
+        "LINE_API_ENDPOINT": f"http://127.0.0.1:{api_port}",
+        "LINE_CHANNEL_SECRET": secret,
+        "LINE_CHANNEL_ACCESS_TOKEN": "bench-token",
+    })
+
+    _FakeLineApi.delay = args.api_delay
+    api = ThreadingHTTPServer(("127.0.0.1", api_port), _FakeLineApi)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+
+    import uvicorn
+    from app.push.line_command_handler import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=app_port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    # handle_message 每筆事件都會 print，壓測時導向 /dev/null
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        started = time.perf_counter()
+        latencies, errors, busy, elapsed = asyncio.run(
+            _run_load(f"http://127.0.0.1:{app_port}/callback", secret, args.events, args.concurrency))
+        deadline = time.time() + 60
+        while _FakeLineApi.replies < args.events - errors - busy and time.time() < deadline:
+            time.sleep(0.05)
+        processed = time.perf_counter() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"[RESULT] events={args.events} concurrency={args.concurrency} api_delay={args.api_delay}s")
+    print(f"  webhook ack  : {args.events / elapsed:8.1f} events/s  p50={p(0.50):.1f}ms  p99={p(0.99):.1f}ms  errors={errors}  busy(503)={busy}")
+    print(f"  processed    : {_FakeLineApi.replies / processed:8.1f} events/s  replies={_FakeLineApi.replies}/{args.events}")
+    server.should_exit = True
+    api.shutdown()
+
+if __name__ == "__main__":
+    main()
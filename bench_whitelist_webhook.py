@@ -0,0 +1,150 @@
+"""
+/internal/whitelist/upsert 寫入壓測：重播一波帶簽章的續訂 webhook（含付款方重送）。
+資料庫以本機替身模擬（每次 execute 固定延遲），不會寫入真正的 Supabase。
+用法：python bench_whitelist_webhook.py [--requests 1000] [--concurrency 50] [--dup-ratio 0.3] [--db-delay 0.03]
+"""
+import os
+import json
+import time
+import hmac
+import random
+import hashlib
+import argparse
+import asyncio
+import threading
+
+class _Resp:
+    def __init__(self, data):
+        self.data = data
+
+class _FakeQuery:
+    def __init__(self, db, name):
+        self.db, self.name = db, name
+        self.op, self.payload, self.filters = "select", None, []
+
+    def select(self, *args, **kwargs):
+        self.op = "select"
+        return self
+
+    def eq(self, col, val):
+        self.filters.append((col, val))
+        return self
+
+    def limit(self, n):
+        return self
+
+    def insert(self, row, **kwargs):
+        self.op, self.payload = "insert", row
+        return self
+
+    def upsert(self, row, **kwargs):
+        self.op, self.payload = "upsert", row
+        return self
+
+    def execute(self):
+        time.sleep(self.db.delay)  # 模擬 Supabase 往返
+        with self.db.lock:
+            self.db.calls += 1
+            rows = self.db.tables.setdefault(self.name, [])
+            if self.op == "select":
+                return _Resp([r for r in rows if all(r.get(c) == v for c, v in self.filters)])
+            if self.op == "insert" and self.name == "whitelist_events":
+                key = self.payload["idempotency_key"]
+                if key in self.db.idem_keys:
+                    raise RuntimeError("duplicate key value violates unique constraint")
+                self.db.idem_keys.add(key)
+            rows.append(self.payload)
+            return _Resp([])
+
+class _FakeSupabase:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.idem_keys = set()
+        self.tables = {"subscription_plans": [
+            {"plan_code": code, "is_active": True, "tier": code.split("_")[0], "period": code.split("_")[1],
+             "period_months": 1 if code.endswith("month") else 12, "scope": []}
+            for code in ("pro_month", "pro_year", "elite_month", "elite_year")
+        ]}
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+def _burst(n_requests, dup_ratio, seed=7):
+    """n_requests 筆請求，其中 dup_ratio 比例為先前請求的重送（相同 idempotency key 與 body）"""
+    rng = random.Random(seed)
+    sent = []
+    for i in range(n_requests):
+        if sent and rng.random() < dup_ratio:
+            sent.append(rng.choice(sent))
+            continue
+        body = json.dumps({
+            "provider": "line",
+            "user_id": f"Ubench{i:06d}",
+            "plan_code": rng.choice(["pro_month", "pro_year", "elite_month", "elite_year"]),
+            "order_no": f"ORD{i:06d}",
+            "access_until": "2099-01-01T00:00:00Z",
+            "ts": int(time.time()),
+        })
+        sent.append((f"renew-{i}", body))
+    return sent
+
+async def _replay(app, secret, burst, concurrency):
+    import httpx
+
+    latencies = []
+    status = {}
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(idem_key, body):
+            sig = hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+            headers = {"X-Signature": sig, "X-Idempotency-Key": idem_key, "Content-Type": "application/json"}
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await client.post("/internal/whitelist/upsert", content=body, headers=headers)
+                latencies.append(time.perf_counter() - t0)
+            key = "idempotent" if resp.status_code == 200 and resp.json().get("idempotent") else resp.status_code
+            status[key] = status.get(key, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(k, b) for k, b in burst))
+        elapsed = time.perf_counter() - t0
+    return latencies, status, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--dup-ratio", type=float, default=0.3, help="付款方重送比例")
+    parser.add_argument("--db-delay", type=float, default=0.03, help="資料庫替身每次 execute 延遲（秒）")
+    args = parser.parse_args()
+
+    secret = "bench-secret"
+    os.environ["BOT_SECRET"] = secret
+    from fastapi import FastAPI
+    import app.internal_whitelist as internal_whitelist
+    from app.clients import set_client
+
+    fake = _FakeSupabase(args.db_delay)
+    set_client("supabase", fake)
+    internal_whitelist.BOT_SECRET = secret
+    internal_whitelist.preload_plans()
+    fake.calls = 0
+
+    app = FastAPI()
+    app.include_router(internal_whitelist.router)
+    burst = _burst(args.requests, args.dup_ratio)
+    latencies, status, elapsed = asyncio.run(_replay(app, secret, burst, args.concurrency))
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"[RESULT] requests={args.requests} concurrency={args.concurrency} "
+          f"dup_ratio={args.dup_ratio} db_delay={args.db_delay}s")
+    print(f"  throughput : {args.requests / elapsed:8.1f} req/s  p50={p(0.50):.1f}ms  p99={p(0.99):.1f}ms")
+    print(f"  responses  : {status}")
+    print(f"  db calls   : {fake.calls}（{fake.calls / args.requests:.2f} / request）")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 from app.fetcher.daily_asset_snapshot import daily_asset_snapshot
@@ -7,30 +8,47 @@ from app.fetcher.fetch_exchange_balance import fetch_and_save_exchange_balance
 from app.fetcher.fetch_funding_rate import fetch_and_save_funding_rate
 from app.fetcher.fetch_whale_alert import fetch_and_save_whale_alert
 from app.push.push_utils import push_flex_to_targets
-from app.push.flex_utils import get_full_flex_carousel 
+from app.carousel_store import get_daily_carousel
 from app.btc_holder_distribution import fetch_btc_holder_distribution
 from app.btc_holder_distribution_df import btc_holder_df_to_db
 from app.db import upsert_btc_holder_distribution
+from app.job_runner import run_jobs
+from app.fetcher.coinglass_client import response_cache
+from app.render_pool import warm_render_pool
 
-def fetch_all_data():
-    fetch_etf_daily("BTC", days=5)
-    fetch_etf_daily("ETH", days=5)
-    daily_asset_snapshot()
+def fetch_and_save_btc_holder():
     # 新增：抓六大類
     df_btc_holder = fetch_btc_holder_distribution()
     df_btc_holder = btc_holder_df_to_db(df_btc_holder)
     upsert_btc_holder_distribution(df_btc_holder)
-    fetch_and_save_fear_greed()
-    fetch_and_save_exchange_balance()
-    fetch_and_save_funding_rate()
-    fetch_and_save_whale_alert()
-    
+
+FETCH_JOBS = {
+    "etf_btc": lambda: fetch_etf_daily("BTC", days=5),
+    "etf_eth": lambda: fetch_etf_daily("ETH", days=5),
+    "asset_snapshot": daily_asset_snapshot,
+    "btc_holder": fetch_and_save_btc_holder,
+    "fear_greed": fetch_and_save_fear_greed,
+    "exchange_balance": fetch_and_save_exchange_balance,
+    "funding_rate": fetch_and_save_funding_rate,
+    "whale_alert": fetch_and_save_whale_alert,
+}
+
+def fetch_all_data(max_workers=None, timeout=None):
+    # 各資料源互相獨立，並行抓取；單一來源失敗/逾時不影響其他
+    # 同一輪內重複的 Coinglass 請求（如交易所餘額）共用同一份回應
+    max_workers = max_workers or int(os.getenv("FETCH_MAX_WORKERS", str(len(FETCH_JOBS))))
+    timeout = timeout or float(os.getenv("FETCH_JOB_TIMEOUT", "180"))
+    with response_cache():
+        return run_jobs(FETCH_JOBS, max_workers=max_workers, timeout=timeout, label="fetch_all_data")
+
 def push_all_reports():
-    # 這裡直接產生五合一 carousel 並推播多用戶
-    flex_carousel = get_full_flex_carousel()
+    # 五合一 carousel：有新資料才重建，否則沿用快照；並推播多用戶
+    flex_carousel = get_daily_carousel()
     push_flex_to_targets(flex_carousel)
 
 def main():
+    # 繪圖 worker 預先啟動並載入字型
+    warm_render_pool()
     sched = BlockingScheduler(timezone="Asia/Taipei")
 
     # 13:50 抓取資料    